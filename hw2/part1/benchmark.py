@@ -0,0 +1,80 @@
+# Scaling benchmark for the local value numbering functions in
+# skeleton.py. For block lengths 10, 100, ... up to --max-length, a
+# random block is generated (see generator.py) and do_numbering and
+# each replace_redundant_partN are timed. Each function is run twice:
+# once for the wall time, and once under tracemalloc for the peak
+# memory (tracemalloc slows the code down, so it is not timed).
+#
+# usage: python3 benchmark.py [--max-length 1000000] [--json out.json]
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import skeleton
+from generator import random_block
+
+PASSES = ["replace_redundant_part1", "replace_redundant_part2",
+          "replace_redundant_part3", "replace_redundant_part4"]
+
+# Run fn(arg), returning its result and the wall time in seconds
+def timed(fn, arg):
+    start = time.perf_counter()
+    res = fn(arg)
+    return res, time.perf_counter() - start
+
+# Run fn(arg), returning the peak memory allocated during the call in
+# bytes
+def peak_memory(fn, arg):
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+# Benchmark every function on one block of 'length' instructions.
+# Returns one row per function.
+def bench_length(rng, length, num_vars, redefine_rate):
+    block = random_block(rng, length, num_vars=num_vars, redefine_rate=redefine_rate)
+    rows = []
+
+    numbered, seconds = timed(skeleton.do_numbering, block)
+    rows.append(("do_numbering", seconds, peak_memory(skeleton.do_numbering, block)))
+
+    for name in PASSES:
+        fn = getattr(skeleton, name)
+        _, seconds = timed(fn, numbered)
+        rows.append((name, seconds, peak_memory(fn, numbered)))
+
+    return [{"function": name,
+             "length": length,
+             "seconds": seconds,
+             "instructions_per_second": length / seconds if seconds else float("inf"),
+             "peak_bytes": peak}
+            for name, seconds, peak in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-length', type=int, default=10**6, help='largest block length')
+    parser.add_argument('--vars', type=int, default=26, help='size of the variable pool')
+    parser.add_argument('--redefine-rate', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    length = 10
+    print("%-24s %9s %12s %16s %14s" % ("function", "length", "seconds", "instrs/second", "peak memory"))
+    while length <= args.max_length:
+        for r in bench_length(rng, length, args.vars, args.redefine_rate):
+            print("%-24s %9d %12.6f %16.0f %12.1f KB" % (r["function"], r["length"], r["seconds"],
+                                                          r["instructions_per_second"], r["peak_bytes"] / 1024))
+            results.append(r)
+        length *= 10
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,111 @@
+# Test corpus format for UCSC CSE211 Homework 2: part 1
+#
+# A corpus is a JSON Lines file with one test case per line:
+#
+#   {"id":0,"block":[["a","b","+","b"],["b","a"]],"result":[3,4,0,0]}
+#
+# "block" is the list of instructions of the (unnumbered) basic
+# block. An arithmetic instruction 'lhs = op1 op op2' is stored as
+# [lhs, op1, op, op2] and an assignment 'lhs = rhs' as [lhs, rhs].
+# "result" is the expected number of removed instructions for each
+# of the 4 parts.
+#
+# Unlike test_cases.py, a corpus does not have to be compiled and
+# imported: it is read one test case at a time.
+
+import json
+import re
+import sys
+
+from skeleton import Variable, AssignmentInstr, ArithmeticInstr, BasicBlock
+
+# Given an instruction, return its corpus representation
+def encode_instruction(instr):
+    if isinstance(instr, AssignmentInstr):
+        return [instr.lhs.get_name(), instr.rhs.get_name()]
+    return [instr.lhs.get_name(), instr.op1.get_name(), instr.op, instr.op2.get_name()]
+
+# Given the corpus representation of an instruction, return the
+# (unnumbered) instruction
+def decode_instruction(i):
+    if len(i) == 2:
+        return AssignmentInstr(Variable(i[0]), Variable(i[1]))
+    return ArithmeticInstr(Variable(i[0]), Variable(i[1]), i[2], Variable(i[3]))
+
+# Given a test id, a basic block and the expected results, return one
+# line of the corpus (without the trailing newline)
+def encode_test_case(test_id, block, result):
+    record = {"id": test_id,
+              "block": [encode_instruction(i) for i in block.instruction_list()],
+              "result": list(result)}
+    return json.dumps(record, separators=(",", ":"))
+
+# Given one line of the corpus, return the test id, the basic block
+# and the expected results
+def decode_test_case(line):
+    record = json.loads(line)
+    block = BasicBlock([decode_instruction(i) for i in record["block"]])
+    return record["id"], block, record["result"]
+
+# Write an iterable of (test id, basic block, results) to a corpus
+# file
+def write_corpus(path, test_cases):
+    with open(path, "w") as f:
+        for test_id, block, result in test_cases:
+            f.write(encode_test_case(test_id, block, result) + "\n")
+
+# Lazily iterate over the raw lines of a corpus file, skipping blank
+# lines
+def read_corpus_lines(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+# Lazily iterate over the (test id, basic block, results) of a corpus
+# file. Only one test case is held in memory at a time.
+def read_corpus(path):
+    for line in read_corpus_lines(path):
+        yield decode_test_case(line)
+
+# Iterate over the (test id, basic block, results) of a test module
+# in the test_cases.py format, ordered by test id (test_block2 comes
+# before test_block10).
+def read_test_module(module):
+    ids = [int(x[len("test_block"):]) for x in dir(module) if x.startswith("test_block")]
+    for test_id in sorted(ids):
+        yield (test_id,
+               getattr(module, "test_block" + str(test_id)),
+               getattr(module, "test_result" + str(test_id)))
+
+Block_Re = re.compile(r"^test_block(\d+)\s*=")
+Result_Re = re.compile(r"^test_result(\d+)\s*=\s*\[([^\]]*)\]")
+Instr_Re = re.compile(r"ArithmeticInstr\(Variable\('(\w+)'\),Variable\('(\w+)'\),'([-+*/])',Variable\('(\w+)'\)\)")
+
+# Convert the output of BasicBlock.print_test_case (e.g. test_cases.py)
+# into corpus lines. The text is parsed line by line, nothing is
+# compiled or evaluated.
+def convert_test_cases(lines):
+    test_id = None
+    block = []
+    for line in lines:
+        m = Block_Re.match(line)
+        if m:
+            test_id = int(m[1])
+            block = []
+
+        for m in Instr_Re.finditer(line):
+            block.append(list(m.groups()))
+
+        m = Result_Re.match(line)
+        if m:
+            assert(test_id == int(m[1]))
+            result = [int(r) for r in m[2].split(",")]
+            yield json.dumps({"id": test_id, "block": block, "result": result}, separators=(",", ":"))
+            test_id = None
+
+# usage: python3 corpus.py test_cases.py test_cases.jsonl
+if __name__ == "__main__":
+    with open(sys.argv[1], "r") as src, open(sys.argv[2], "w") as dst:
+        for line in convert_test_cases(src):
+            dst.write(line + "\n")
@@ -0,0 +1,95 @@
+# Random basic block generator for UCSC CSE211 Homework 2: part 1
+#
+# Generates unnumbered basic blocks of arithmetic instructions, like
+# the ones in test_cases.py, and writes them with their expected
+# results (computed with the reference implementation in
+# skeleton.py) either as a corpus (see corpus.py) or in the
+# BasicBlock.print_test_case format.
+#
+# usage: python3 generator.py out.jsonl --count 1000 --length 100 --seed 0
+
+import argparse
+import random
+
+import corpus
+from skeleton import Variable, ArithmeticInstr, BasicBlock, check_replaced_instructions
+
+OPS = "+-*/"
+
+# Return the name of the i'th variable: a, b, ..., z, aa, ab, ...
+# Names never contain digits, so they can not be confused with the
+# numbering added by do_numbering.
+def var_name(i):
+    name = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        name = chr(ord('a') + r) + name
+    return name
+
+# Generate a random basic block of 'length' arithmetic instructions.
+#   rng:           a random.Random instance (use a seeded one for
+#                  reproducible blocks)
+#   num_vars:      the size of the variable pool
+#   ops:           the operators to pick from
+#   op_weights:    relative weight of each operator (uniform if None)
+#   redefine_rate: probability that an instruction assigns to a
+#                  variable that was already assigned in the block
+#                  (as opposed to a variable not assigned yet)
+def random_block(rng, length, num_vars=4, ops=OPS, op_weights=None, redefine_rate=0.5):
+    names = [var_name(i) for i in range(num_vars)]
+    undefined = names[:]
+    rng.shuffle(undefined)
+    defined = []
+
+    block = BasicBlock([])
+    for _ in range(length):
+        op1 = rng.choice(names)
+        op2 = rng.choice(names)
+        op = rng.choices(ops, weights=op_weights)[0]
+
+        if defined and (not undefined or rng.random() < redefine_rate):
+            lhs = rng.choice(defined)
+        else:
+            lhs = undefined.pop()
+            defined.append(lhs)
+
+        block.add_instruction(ArithmeticInstr(Variable(lhs), Variable(op1), op, Variable(op2)))
+    return block
+
+# Return the expected number of replaced instructions for each part,
+# according to the reference implementation
+def expected_result(block):
+    res = check_replaced_instructions(block)
+    return [res[1], res[3], res[5], res[7]]
+
+# Lazily generate 'count' (test id, block, results) test cases. Extra
+# keyword arguments are passed to random_block.
+def random_test_cases(seed, count, length, **kwargs):
+    rng = random.Random(seed)
+    for test_id in range(count):
+        block = random_block(rng, length, **kwargs)
+        yield test_id, block, expected_result(block)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', help='the file to write')
+    parser.add_argument('--format', choices=['jsonl', 'py'], default='jsonl', help='a corpus file, or a python module like test_cases.py')
+    parser.add_argument('--count', type=int, default=128, help='number of test cases')
+    parser.add_argument('--length', type=int, default=50, help='number of instructions per block')
+    parser.add_argument('--vars', type=int, default=4, help='size of the variable pool')
+    parser.add_argument('--ops', default=OPS, help='operators to pick from')
+    parser.add_argument('--op-weights', type=float, nargs='+', help='relative weight of each operator')
+    parser.add_argument('--redefine-rate', type=float, default=0.5, help='probability of assigning to an already assigned variable')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tests = random_test_cases(args.seed, args.count, args.length, num_vars=args.vars, ops=list(args.ops),
+                              op_weights=args.op_weights, redefine_rate=args.redefine_rate)
+    if args.format == 'jsonl':
+        corpus.write_corpus(args.output, tests)
+    else:
+        with open(args.output, "w") as f:
+            f.write("from skeleton import *\n")
+            for test_id, block, result in tests:
+                f.write(block.print_test_case(test_id, *result))
@@ -0,0 +1,115 @@
+# Parallel version of tester.py: the test corpus is split into shards
+# that are checked by a pool of worker processes. Shard results are
+# merged in corpus order, so the output does not depend on --jobs.
+#
+# usage: python3 parallel_tester.py [corpus.jsonl] [--jobs N] [--fail-fast]
+
+import argparse
+import functools
+import itertools
+import multiprocessing
+import os
+
+import corpus
+import skeleton as candidate
+
+PARTS = 4
+
+# Check one test case. Returns the number of removed operations found
+# for each part, and whether each part passed.
+def check_test_case(bb, result):
+    res = candidate.check_replaced_instructions(bb)
+    found = [res[1], res[3], res[5], res[7]]
+    return found, [result[p] == found[p] for p in range(PARTS)]
+
+# Check a shard of raw corpus lines. This is what the worker processes
+# run. Returns per-part passed/failed/removed counts, and the failures
+# in corpus order. If fail_fast is set, the shard stops at its first
+# failing test case, and the test cases after it are not counted.
+def check_shard(lines, fail_fast=False):
+    passed = [0] * PARTS
+    failed = [0] * PARTS
+    total = [0] * PARTS
+    failures = []
+
+    for line in lines:
+        idx, bb, result = corpus.decode_test_case(line)
+        found, ok = check_test_case(bb, result)
+        for p in range(PARTS):
+            total[p] += found[p]
+            if ok[p]:
+                passed[p] += 1
+            else:
+                failed[p] += 1
+        if not all(ok):
+            failures.append((idx, bb.pprint(), result, found))
+            if fail_fast:
+                break
+
+    return passed, failed, total, failures
+
+# Split an iterable into lists of at most 'size' elements
+def shards(iterable, size):
+    it = iter(iterable)
+    while True:
+        shard = list(itertools.islice(it, size))
+        if not shard:
+            return
+        yield shard
+
+def print_failure(idx, block, result, found):
+    print("----------------------")
+    print("failed on test case: " + str(idx))
+    print(block)
+    print("expected number of removed instructions for each part: " + str(result))
+    print("found: " + str(found))
+    print("----------------------")
+
+# Check every test case of the corpus file using 'jobs' processes.
+# If fail_fast is set, stop after the first failing test case (in
+# corpus order); the test cases after it are not counted.
+def run_corpus(path, jobs, shard_size=256, fail_fast=False):
+    passed = [0] * PARTS
+    failed = [0] * PARTS
+    total = [0] * PARTS
+
+    work = shards(corpus.read_corpus_lines(path), shard_size)
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    check = functools.partial(check_shard, fail_fast=fail_fast)
+    results = pool.imap(check, work) if pool else map(check, work)
+
+    try:
+        for shard_passed, shard_failed, shard_total, failures in results:
+            for p in range(PARTS):
+                passed[p] += shard_passed[p]
+                failed[p] += shard_failed[p]
+                total[p] += shard_total[p]
+
+            if fail_fast and failures:
+                print_failure(*failures[0])
+                break
+            for f in failures:
+                print_failure(*f)
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    return passed, failed, total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('corpus', nargs='?', default='test_cases.jsonl', help='the test corpus (see corpus.py)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--shard-size', type=int, default=256, help='number of test cases sent to a worker at a time')
+    parser.add_argument('-x', '--fail-fast', action='store_true', help='stop at the first failing test case')
+    args = parser.parse_args()
+
+    passed, failed, total = run_corpus(args.corpus, args.jobs, args.shard_size, args.fail_fast)
+
+    for p in range(PARTS):
+        print("---------")
+        print("part " + str(p + 1) + ":")
+        print("passed: " + str(passed[p]))
+        print("failed: " + str(failed[p]))
+        print("total removed operations: " + str(total[p]))
@@ -308,15 +308,39 @@ def replace_redundant_part4(input_block):
     # increment every time an arithmetic instruction is replaced
     replaced_instructions = 0
     
-    # Signature -> Assigned Variable "Name Set"
-    signature_to_name_set = defaultdict(lambda: set())
+    # Signature -> Assigned Variable "Name Set". The names are the keys
+    # of a dict, kept in the order they were assigned, so the most
+    # recently assigned alias is the last key. Signatures without
+    # names are deleted.
+    signature_to_name_set = {}
 
     # Variable Name -> Most Recent Signature
     name_to_signature = {}
 
+    # Variable Name -> Signatures that read the variable. Once the
+    # variable is overwritten these signatures can never be computed
+    # again, so they are deleted along with their names.
+    name_to_operand_signatures = defaultdict(lambda: set())
+
+    # Signature -> Names of its two operands
+    signature_to_operand_names = {}
+
     # Variable Name -> Most Recent Number
     name_to_number = {}
 
+    # remove a name from the name set of its signature
+    def remove_name(name):
+        signature = name_to_signature.pop(name)
+        name_set = signature_to_name_set[signature]
+        del name_set[name]
+        if not name_set:
+            del signature_to_name_set[signature]
+            for operand_name in signature_to_operand_names.pop(signature):
+                operand_signatures = name_to_operand_signatures[operand_name]
+                operand_signatures.discard(signature)
+                if not operand_signatures:
+                    del name_to_operand_signatures[operand_name]
+
     for instr in input_block.instruction_list():
 
         # You can assume only arithmetic operations        
@@ -328,27 +352,130 @@ def replace_redundant_part4(input_block):
         (op1, op2) = (op1, op2) if op1.get_number() < op2.get_number() or op not in ['+', '*'] else (op2, op1)
         signature = op1.pprint() + op + op2.pprint()
 
-        # If the signature exists, replace it with any of the alias variable
-        if len(signature_to_name_set[signature]):
+        # If the signature exists, replace it with the most recently assigned alias variable
+        if signature in signature_to_name_set:
             replaced_instructions += 1
-            alias_name = next(iter(signature_to_name_set[signature]))
+            alias_name = next(reversed(signature_to_name_set[signature]))
             return_block.add_instruction(AssignmentInstr(lhs, Variable(alias_name, name_to_number[alias_name])))
         else:
             return_block.add_instruction(instr)
-        
+
+        name = lhs.get_name()
+
         # If the variable is overwritten, remove its previous alias expression
-        if lhs.get_name() in name_to_signature:
-            signature_to_name_set[name_to_signature[lhs.get_name()]].remove(lhs.get_name())
-        
+        if name in name_to_signature:
+            remove_name(name)
+
+        # ... and the alias expressions that read it
+        for dead_signature in list(name_to_operand_signatures.get(name, ())):
+            for dead_name in list(signature_to_name_set[dead_signature]):
+                remove_name(dead_name)
+
         # Different from part3, the signature-to-variable mapping is updated even after an instruction replacement.
-        signature_to_name_set[signature].add(lhs.get_name())
+        # (unless the instruction overwrites one of its own operands, e.g. 'a = a + b')
+        if name != op1.get_name() and name != op2.get_name():
+            signature_to_name_set.setdefault(signature, {})[name] = None
+            name_to_signature[name] = signature
+            signature_to_operand_names[signature] = (op1.get_name(), op2.get_name())
+            name_to_operand_signatures[op1.get_name()].add(signature)
+            name_to_operand_signatures[op2.get_name()].add(signature)
 
-        # Update "most recent" signature/number table
-        name_to_signature[lhs.get_name()] = signature
-        name_to_number[lhs.get_name()] = lhs.get_number()
+        # Update "most recent" number table
+        name_to_number[name] = lhs.get_number()
         
     return return_block, replaced_instructions
 
+# Dead code elimination: takes in a block returned by one of the
+# replace_redundant_partN functions (a mix of arithmetic and
+# assignment instructions, with numbers NOT making variables
+# distinct, like in part3/part4).
+
+# First, copies are propagated forward: after 'z = q', later reads of
+# 'z' read 'q' directly, as long as neither 'z' nor 'q' has been
+# assigned a new value since the copy.
+
+# Then a backward liveness sweep removes every instruction whose
+# result is overwritten before it is read. Every variable is assumed
+# to be live at the end of the block, so the last assignment to each
+# variable is always kept. Copies of a variable to itself (e.g. 'a =
+# a' after propagation) are removed as well.
+
+# For example, consider the output of part4:
+# a = b + c
+# q = a
+# z = q
+# q = x + y
+
+# After copy propagation 'z = q' becomes 'z = a', which makes 'q = a'
+# dead because 'q' is overwritten before being read again.
+
+# It returns the new block, along with an integer indicating how many
+# instructions were removed
+def eliminate_dead_code(input_block):
+
+    # Forward pass: copy propagation
+
+    propagated = []
+
+    # Variable Name -> Variable it is a copy of
+    name_to_copy = {}
+
+    # Variable Name -> Names that are currently copies of it
+    name_to_copied_names = defaultdict(lambda: set())
+
+    for instr in input_block.instruction_list():
+        lhs = instr.lhs
+
+        if isinstance(instr, AssignmentInstr):
+            rhs = name_to_copy.get(instr.rhs.get_name(), instr.rhs)
+            instr = AssignmentInstr(lhs, rhs)
+        else:
+            op1 = name_to_copy.get(instr.op1.get_name(), instr.op1)
+            op2 = name_to_copy.get(instr.op2.get_name(), instr.op2)
+            instr = ArithmeticInstr(lhs, op1, instr.op, op2)
+        propagated.append(instr)
+
+        # lhs is overwritten: it is no longer a copy of anything, and
+        # nothing is a copy of it anymore
+        name = lhs.get_name()
+        if name in name_to_copy:
+            name_to_copied_names[name_to_copy.pop(name).get_name()].discard(name)
+        for copied_name in name_to_copied_names.pop(name, ()):
+            del name_to_copy[copied_name]
+
+        if isinstance(instr, AssignmentInstr) and instr.rhs.get_name() != name:
+            name_to_copy[name] = instr.rhs
+            name_to_copied_names[instr.rhs.get_name()].add(name)
+
+    # Backward pass: remove dead assignments
+
+    kept = []
+
+    # Variable Names that are overwritten later in the block before
+    # being read
+    dead_names = set({})
+
+    for instr in reversed(propagated):
+        name = instr.lhs.get_name()
+
+        if name in dead_names:
+            continue
+        if isinstance(instr, AssignmentInstr) and instr.rhs.get_name() == name:
+            continue
+
+        kept.append(instr)
+
+        # the assignment kills the variable, then its operands are read
+        dead_names.add(name)
+        if isinstance(instr, AssignmentInstr):
+            dead_names.discard(instr.rhs.get_name())
+        else:
+            dead_names.discard(instr.op1.get_name())
+            dead_names.discard(instr.op2.get_name())
+
+    kept.reverse()
+    return BasicBlock(kept), len(propagated) - len(kept)
+
 # This is required for grading. It runs all 4 parts and returns how
 # many operations were replaced.
 def check_replaced_instructions(b):
@@ -409,6 +536,36 @@ block6 = BasicBlock([ArithmeticInstr(vA, vC, PLUS, vD),
           ArithmeticInstr(vA, vF, PLUS, vF),
           ArithmeticInstr(vE, vC, PLUS, vD),])
 
+# Blocks with copies, as replace_redundant_part4 can return them, for
+# eliminate_dead_code
+
+# a chain of copies: once 'e' and 'f' read 'a', the copies 'd = a' and
+# 'e = d' are overwritten before being read
+dce_block1 = BasicBlock([ArithmeticInstr(vA, vB, PLUS, vC),
+          AssignmentInstr(vD, vA),
+          AssignmentInstr(vE, vD),
+          AssignmentInstr(vF, vE),
+          ArithmeticInstr(vD, vB, MINUS, vC),
+          AssignmentInstr(vE, vD)])
+
+# the source of a copy is redefined: 'e = d' must not become 'e = a'
+dce_block2 = BasicBlock([AssignmentInstr(vD, vA),
+          ArithmeticInstr(vA, vB, PLUS, vC),
+          AssignmentInstr(vE, vD),
+          ArithmeticInstr(vD, vB, MINUS, vC)])
+
+# the middle of a chain is redefined: 'e' is still a copy of 'a'
+dce_block3 = BasicBlock([AssignmentInstr(vD, vA),
+          AssignmentInstr(vE, vD),
+          ArithmeticInstr(vD, vB, PLUS, vC),
+          AssignmentInstr(vF, vE)])
+
+# a dead store, and a copy back to its source ('a = d' becomes 'a = a')
+dce_block4 = BasicBlock([ArithmeticInstr(vA, vB, PLUS, vC),
+          ArithmeticInstr(vA, vB, MINUS, vC),
+          AssignmentInstr(vD, vA),
+          AssignmentInstr(vA, vD)])
+
 # Some local checks to help you debug.
 def check_block(block, p1, p2, p3, p4):
     res = check_replaced_instructions(block)
@@ -417,6 +574,19 @@ def check_block(block, p1, p2, p3, p4):
     assert(res[5] == p3)
     assert(res[7] == p4)
 
+def check_dead_code(block, removed):
+    res = check_replaced_instructions(block)
+    dce_b, dce_c = eliminate_dead_code(res[6])
+    assert(dce_c == removed)
+    assert(len(dce_b.instruction_list()) == len(block.instruction_list()) - removed)
+
+# eliminate_dead_code on a block with copies, and the instructions it
+# keeps
+def check_dead_code_copies(block, kept):
+    dce_b, dce_c = eliminate_dead_code(block)
+    assert([i.pprint() for i in dce_b.instruction_list()] == kept)
+    assert(dce_c == len(block.instruction_list()) - len(kept))
+
 if __name__ == "__main__":
     check_block(block1, 1, 1, 1, 1)
     check_block(block2, 0, 1, 1, 1)
@@ -424,3 +594,11 @@ if __name__ == "__main__":
     check_block(block4, 3, 3, 3, 3)
     check_block(block5, 0, 0, 0, 0)
     check_block(block6, 2, 2, 1, 2)
+    check_dead_code(block1, 0)
+    check_dead_code(block4, 1)
+    check_dead_code(block5, 0)
+    check_dead_code(block6, 0)
+    check_dead_code_copies(dce_block1, ["a = b + c", "f = a", "d = b - c", "e = d"])
+    check_dead_code_copies(dce_block2, ["d = a", "a = b + c", "e = d", "d = b - c"])
+    check_dead_code_copies(dce_block3, ["e = a", "d = b + c", "f = a"])
+    check_dead_code_copies(dce_block4, ["a = b - c", "d = a"])
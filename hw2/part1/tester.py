@@ -1,8 +1,20 @@
-import test_cases
+import importlib
+import os
+import sys
+import corpus
 import skeleton as candidate
 
-test_blocks = eval("[" + ",".join(sorted(["test_cases."+x for x in dir(test_cases) if "test_block" in x])) + "]")
-test_results = eval("[" + ",".join(sorted(["test_cases."+x for x in dir(test_cases) if "test_result" in x])) + "]")
+# usage: python3 tester.py [corpus.jsonl | test_cases.py]
+# without an argument, the corpus in test_cases.jsonl is used (as in
+# parallel_tester.py). A .py file is imported as a test module in the
+# test_cases.py format instead, which is much slower to load.
+path = sys.argv[1] if len(sys.argv) > 1 else "test_cases.jsonl"
+if path.endswith(".py"):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    test_module = importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+    tests = corpus.read_test_module(test_module)
+else:
+    tests = corpus.read_corpus(path)
 
 passed_1 = 0
 failed_1 = 0
@@ -21,9 +33,7 @@ total_2 = 0
 total_3 = 0
 total_4 = 0
 
-for idx in range(len(test_blocks)):
-    bb = test_blocks[idx]
-    result = test_results[idx]
+for idx, bb, result in tests:
     res = candidate.check_replaced_instructions(bb)
 
     total_1 += res[1]
@@ -0,0 +1,58 @@
+# Batch version of skeleton.py: analyses every python file given on
+# the command line (directories are searched recursively) in a single
+# process, or in a pool of --jobs processes, and prints the
+# uninitialized variables of each file as JSON.
+#
+# usage: python3 batch.py test_cases/ --jobs 4 [-o results.json] [--cache-dir .cfgcache]
+#        python3 batch.py test_cases/ --vectorized
+
+import argparse
+import json
+import os
+import sys
+
+from skeleton import find_undefined_variables_many
+from pycfg.cfgcache import CACHE_DIR_ENV
+
+# Expand directories into the python files they contain, sorted so
+# the output does not depend on the file system order
+def find_python_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files += [os.path.join(root, n) for n in sorted(names) if n.endswith('.py')]
+        else:
+            files.append(path)
+    return files
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='python files or directories to analyze')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('-o', '--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--cache-dir', help='cache the CFGs of the files in this directory, so unchanged '
+                                            'files are not parsed again (see pycfg/cfgcache.py)')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='solve the liveness of all the files at once with numpy (see vectorized.py); '
+                             'ignores --jobs')
+    args = parser.parse_args()
+
+    if args.cache_dir:
+        # set in the environment so the worker processes use it too
+        os.environ[CACHE_DIR_ENV] = args.cache_dir
+
+    if args.vectorized:
+        # numpy is only needed for this mode
+        from vectorized import find_undefined_variables_vectorized
+        results = find_undefined_variables_vectorized(find_python_files(args.paths))
+    else:
+        results = find_undefined_variables_many(find_python_files(args.paths), jobs=args.jobs)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
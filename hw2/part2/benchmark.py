@@ -0,0 +1,126 @@
+# Liveness benchmark on generated programs (see generator.py)
+#
+# For programs of 100, 1000, ... up to --max-statements statements, the
+# LiveOut problem of compute_LiveOut in skeleton.py is solved with each
+# solver of dataflow.py (round_robin and worklist) in each traversal
+# order:
+#
+#   default:   node creation order (roughly the program text order)
+#   rpo:       reverse postorder on the CFG
+#   rpo_rcfg:  reverse postorder on the reverse CFG
+#
+# and the wall time, node evaluations, iterations (passes over the
+# order) and peak memory of each run are recorded. As in
+# hw2/part1/benchmark.py, the peak memory comes from a second run
+# under tracemalloc, which is not timed.
+#
+# The results of a run with the default arguments are kept in
+# benchmark_baseline.json.
+#
+# usage: python3 benchmark.py [--max-statements 10000] [--json benchmark_baseline.json]
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from pycfg.pycfg import PyCFG
+from pycfg.flowgraph import FlowGraph
+from dataflow import BitDomain, UNION, solve, solve_round_robin
+from generator import random_program
+
+SOLVERS = {"round_robin": solve_round_robin, "worklist": solve}
+
+ORDERS = {"default": lambda CFG: list(CFG.nodes()),
+          "rpo": lambda CFG: CFG.traversal.reverse_postorder(),
+          "rpo_rcfg": lambda CFG: CFG.traversal.reverse_cfg_reverse_postorder()}
+
+# The LiveOut problem of a program: the arguments of the solvers
+def liveness_problem(src):
+    cfg = PyCFG()
+    cfg.gen_cfg(src.strip())
+    CFG = FlowGraph.from_pycfg(cfg)
+    domain = BitDomain()
+    gen = {}
+    kill = {}
+    for n in CFG.nodes():
+        instr = CFG.instruction(n)
+        for v in instr.reads | instr.writes:
+            domain.add(v)
+        gen[n] = domain.encode(instr.reads)
+        kill[n] = domain.encode(instr.writes)
+    successors = {n: CFG.successors(n) for n in CFG.nodes()}
+    predecessors = {n: CFG.predecessors(n) for n in CFG.nodes()}
+    return CFG, domain, (successors, predecessors, gen, kill)
+
+# Run one solver in one order, returning its results and statistics
+def run(solver, problem, order):
+    stats = {}
+    start = time.perf_counter()
+    values, evaluations = solver(*problem, direction="backward", meet=UNION, order=order, stats=stats)
+    seconds = time.perf_counter() - start
+    return values, seconds, evaluations, stats["iterations"]
+
+# The peak memory allocated by one run, in bytes
+def peak_memory(solver, problem, order):
+    tracemalloc.start()
+    solver(*problem, direction="backward", meet=UNION, order=order)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+# Benchmark every solver and order on one generated program. Returns
+# one row per (solver, order).
+def bench_size(rng, statements, num_vars, max_depth):
+    src = random_program(rng, statements, num_vars=num_vars, max_depth=max_depth)
+    CFG, domain, problem = liveness_problem(src)
+
+    rows = []
+    expected = None
+    for solver_name, solver in SOLVERS.items():
+        for order_name, get_order in ORDERS.items():
+            order = get_order(CFG)
+            values, seconds, evaluations, iterations = run(solver, problem, order)
+            # every solver and order must reach the same fixed point
+            if expected is None:
+                expected = values
+            assert values == expected, (solver_name, order_name)
+            rows.append({"solver": solver_name,
+                         "order": order_name,
+                         "statements": statements,
+                         "nodes": len(CFG),
+                         "variables": len(domain),
+                         "seconds": seconds,
+                         "evaluations": evaluations,
+                         "iterations": iterations,
+                         "peak_bytes": peak_memory(solver, problem, order)})
+    return rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-statements', type=int, default=10000, help='largest program size')
+    parser.add_argument('--vars-ratio', type=int, default=10, help='statements per variable')
+    parser.add_argument('--max-depth', type=int, default=4, help='maximum if/while nesting')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    statements = 100
+    print("%-12s %-9s %7s %7s %5s %10s %12s %6s %14s" % ("solver", "order", "stmts", "nodes", "vars",
+                                                        "seconds", "evaluations", "iters", "peak memory"))
+    while statements <= args.max_statements:
+        num_vars = max(1, statements // args.vars_ratio)
+        for r in bench_size(rng, statements, num_vars, args.max_depth):
+            print("%-12s %-9s %7d %7d %5d %10.6f %12d %6d %11.1f KB" % (r["solver"], r["order"], r["statements"],
+                                                                    r["nodes"], r["variables"], r["seconds"],
+                                                                    r["evaluations"], r["iterations"],
+                                                                    r["peak_bytes"] / 1024))
+            results.append(r)
+        statements *= 10
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,190 @@
+# Bit-vector sets for the dataflow analyses in skeleton.py
+#
+# A BitDomain maps every element of a domain (e.g. the VarDomain of a
+# CFG) to a bit position. A set over the domain is then a python int
+# where bit i is set if the i'th element is in the set, so that
+# union, intersection and complement are single bitwise operations:
+#
+#   A | B      union
+#   A & B      intersection
+#   A & ~B     difference (A - B)
+
+import heapq
+import operator
+
+class BitDomain:
+    def __init__(self, elements=()):
+        # Bit position -> Element
+        self.elements = []
+        # Element -> Bit position
+        self.index = {}
+        for e in sorted(elements):
+            self.add(e)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, e):
+        return e in self.index
+
+    # add an element to the domain (if it is not already there) and
+    # return its bit. Elements added later get higher bit positions,
+    # so existing bit-vectors stay valid.
+    def add(self, e):
+        if e not in self.index:
+            self.index[e] = len(self.elements)
+            self.elements.append(e)
+        return 1 << self.index[e]
+
+    # the bit of a single element
+    def bit(self, e):
+        return 1 << self.index[e]
+
+    # the bit-vector with every element of the domain
+    def full(self):
+        return (1 << len(self.elements)) - 1
+
+    # given an iterable of elements, return its bit-vector
+    def encode(self, elements):
+        bits = 0
+        for e in elements:
+            bits |= 1 << self.index[e]
+        return bits
+
+    # given a bit-vector, return the set of its elements
+    def decode(self, bits):
+        s = set({})
+        while bits:
+            low = bits & -bits
+            s.add(self.elements[low.bit_length() - 1])
+            bits ^= low
+        return s
+
+# Meet operators
+UNION = operator.or_
+INTERSECTION = operator.and_
+
+# Worklist solver for bit-vector dataflow problems of the form
+#
+#   V(n) = meet_{m in input(n)} Gen(m) | (V(m) & ~Kill(m))
+#
+# where input(n) is succ(n) for a backward problem (e.g. LiveOut) and
+# pred(n) for a forward problem (e.g. reaching definitions). Nodes
+# without inputs get the empty set.
+#
+#   successors, predecessors: dicts from each node to a list of nodes
+#   gen, kill:                dicts from each node to a bit-vector
+#   meet:                     UNION (any path) or INTERSECTION (all paths)
+#   top:                      the initial value of every node; 0 for
+#                             UNION, the full domain for INTERSECTION
+#   order:                    the order nodes are first evaluated in.
+#                             Defaults to successors' order; use
+#                             a reverse postorder of the CFG (forward)
+#                             or of the reverse CFG (backward), see
+#                             pycfg/traversal.py
+#   init:                     starting values (e.g. a previous fixed
+#                             point), instead of top
+#   worklist:                 the nodes to evaluate first (defaults to
+#                             all nodes). Other nodes are only
+#                             evaluated if one of their inputs changes.
+#   stats:                    if given a dict, its "iterations" is set
+#                             to the number of passes over 'order':
+#                             a pass ends when the next node to
+#                             evaluate comes before the last one.
+#
+# Only the nodes depending on a node whose value changed are queued
+# again, in 'order' order. Returns the values and the number of node
+# evaluations.
+def solve(successors, predecessors, gen, kill, direction="backward", meet=UNION, top=0,
+          order=None, init=None, worklist=None, stats=None):
+    inputs, dependents, order, position, values = _setup(successors, predecessors, direction,
+                                                         top, order, init)
+
+    if worklist is None:
+        worklist = order
+    queued = set(position[n] for n in worklist)
+    queue = list(queued)
+    heapq.heapify(queue)
+
+    evaluations = 0
+    iterations = 0
+    last = len(order)
+    while queue:
+        i = heapq.heappop(queue)
+        queued.discard(i)
+        if i <= last:
+            iterations += 1
+        last = i
+        n = order[i]
+        evaluations += 1
+
+        new_value = _evaluate(n, inputs, gen, kill, values, meet)
+        if new_value != values[n]:
+            values[n] = new_value
+            for d in dependents[n]:
+                j = position[d]
+                if j not in queued:
+                    queued.add(j)
+                    heapq.heappush(queue, j)
+
+    if stats is not None:
+        stats["iterations"] = iterations
+    return values, evaluations
+
+# Round-robin solver for the same problems, with the same arguments:
+# every node is evaluated in 'order' order, until a whole pass changes
+# nothing (the iterative algorithm of figure 8.14b in the EAC book).
+# Kept as a baseline for solve (see benchmark.py).
+def solve_round_robin(successors, predecessors, gen, kill, direction="backward", meet=UNION, top=0,
+                      order=None, init=None, stats=None):
+    inputs, dependents, order, position, values = _setup(successors, predecessors, direction,
+                                                         top, order, init)
+
+    evaluations = 0
+    iterations = 0
+    changed = True
+    while changed:
+        changed = False
+        iterations += 1
+        for n in order:
+            evaluations += 1
+            new_value = _evaluate(n, inputs, gen, kill, values, meet)
+            if new_value != values[n]:
+                values[n] = new_value
+                changed = True
+
+    if stats is not None:
+        stats["iterations"] = iterations
+    return values, evaluations
+
+# The inputs and dependents of each node for the direction, the full
+# evaluation order (nodes missing from 'order' are appended), the
+# position of each node in it, and the starting values
+def _setup(successors, predecessors, direction, top, order, init):
+    if direction == "backward":
+        inputs, dependents = successors, predecessors
+    else:
+        inputs, dependents = predecessors, successors
+
+    order = list(order) if order is not None else list(successors)
+    position = {n: i for i, n in enumerate(order)}
+    for n in successors:
+        if n not in position:
+            position[n] = len(position)
+            order.append(n)
+
+    values = dict(init) if init is not None else {}
+    for n in successors:
+        if n not in values:
+            values[n] = top
+    return inputs, dependents, order, position, values
+
+# The new value of node n
+def _evaluate(n, inputs, gen, kill, values, meet):
+    new_value = None
+    for m in inputs[n]:
+        v = gen[m] | (values[m] & ~kill[m])
+        new_value = v if new_value is None else meet(new_value, v)
+    if new_value is None:
+        new_value = 0
+    return new_value
@@ -0,0 +1,84 @@
+# Random program generator for UCSC CSE211 Homework 2: part 2
+#
+# Generates programs in the same subset as the test_cases/ files:
+# inputs (x = input()), copies (x = y), and nested if/else and while
+# statements testing a variable. Programs are seeded, so the same
+# arguments always give the same program, and can be made as large as
+# needed (thousands of variables and statements) for benchmark.py.
+#
+# usage: python3 generator.py out_dir --count 10 --statements 1000 --vars 100 --seed 0
+
+import argparse
+import os
+import random
+
+# Return the name of the i'th variable: v0, v1, ...
+def var_name(i):
+    return "v%d" % i
+
+# Generate the source of a random program of about 'statements'
+# statements.
+#   rng:          a random.Random instance (use a seeded one for
+#                 reproducible programs)
+#   num_vars:     the size of the variable pool
+#   max_depth:    the maximum nesting of if and while statements
+#   input_rate:   probability that a variable is read from input() at
+#                 the start of the program. The others may be used
+#                 uninitialized.
+#   branch_rate:  probability that a statement is an if or a while
+#   while_rate:   probability that a branching statement is a while
+#   else_rate:    probability that an if has an else
+def random_program(rng, statements, num_vars=26, max_depth=4, input_rate=0.5,
+                   branch_rate=0.2, while_rate=0.3, else_rate=0.5):
+    names = [var_name(i) for i in range(num_vars)]
+    lines = []
+    for v in names:
+        if rng.random() < input_rate:
+            lines.append("%s = input()" % v)
+
+    # the number of statements left to generate
+    budget = [statements]
+
+    def block(indent, depth):
+        # generate a block of at least one statement. Nested blocks
+        # have 1 to 8 statements, and the top level block uses up the
+        # budget.
+        size = rng.randint(1, 8)
+        emitted = 0
+        while emitted == 0 or (budget[0] > 0 and (depth == 0 or emitted < size)):
+            emitted += 1
+            budget[0] -= 1
+            pad = "    " * indent
+            if depth < max_depth and rng.random() < branch_rate:
+                cond = rng.choice(names)
+                if rng.random() < while_rate:
+                    lines.append("%swhile %s:" % (pad, cond))
+                    block(indent + 1, depth + 1)
+                else:
+                    lines.append("%sif %s:" % (pad, cond))
+                    block(indent + 1, depth + 1)
+                    if rng.random() < else_rate:
+                        lines.append("%selse:" % pad)
+                        block(indent + 1, depth + 1)
+            else:
+                lines.append("%s%s = %s" % (pad, rng.choice(names), rng.choice(names)))
+
+    block(0, 0)
+    return "\n".join(lines) + "\n"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('out_dir', help='directory to write the programs to')
+    parser.add_argument('--count', type=int, default=10, help='number of programs')
+    parser.add_argument('--statements', type=int, default=1000, help='statements per program')
+    parser.add_argument('--vars', type=int, default=100, help='size of the variable pool')
+    parser.add_argument('--max-depth', type=int, default=4, help='maximum if/while nesting')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for i in range(args.count):
+        src = random_program(rng, args.statements, num_vars=args.vars, max_depth=args.max_depth)
+        with open(os.path.join(args.out_dir, "%d.py" % i), "w") as f:
+            f.write(src)
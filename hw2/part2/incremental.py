@@ -0,0 +1,191 @@
+# Incremental liveness analysis for editor and pre-commit integrations.
+#
+# An IncrementalLiveness keeps the AST, the CFG and the LiveOut fixed
+# point of the last version of a file. When the file changes, the new
+# AST is diffed against the cached one:
+#
+#   - if only statement contents changed (same statements and nesting),
+#     the CFG keeps its shape: only the nodes of the changed statements
+#     are patched, and the worklist is re-seeded from them, starting
+#     from the previous fixed point.
+#   - otherwise (statements added, removed or moved, or constructs
+#     outside the supported subset) everything is analysed again.
+
+import argparse
+import ast
+
+from pycfg.pycfg import PyCFG, slurp, test_ast
+from pycfg.flowgraph import FlowGraph, Instruction
+from dataflow import BitDomain, UNION, solve
+
+# statements that create exactly one CFG node each, in preorder.
+# Anything else (functions, for loops, returns, while/else, ...) falls
+# back to a full analysis.
+Simple_Stmts = (ast.Assign, ast.AugAssign, ast.Expr, ast.Pass, ast.Break, ast.Continue)
+
+# raised by flatten when a statement is not supported
+class _Unsupported(Exception):
+    pass
+
+# Return the statements of a module in preorder, along with its
+# "shape": the statement types and nesting, which determine the CFG
+# edges. Returns None for the shape if a statement is not supported.
+def flatten(module):
+    stmts = []
+    shape = []
+
+    def visit(body):
+        for st in body:
+            stmts.append(st)
+            shape.append(type(st).__name__)
+            if isinstance(st, ast.If):
+                shape.append('(')
+                visit(st.body)
+                shape.append(')(')
+                visit(st.orelse)
+                shape.append(')')
+            elif isinstance(st, ast.While) and not st.orelse:
+                shape.append('(')
+                visit(st.body)
+                shape.append(')')
+            elif not isinstance(st, Simple_Stmts):
+                raise _Unsupported(type(st).__name__)
+
+    try:
+        visit(module.body)
+    except _Unsupported:
+        return stmts, None
+    return stmts, tuple(shape)
+
+# The part of a statement that its CFG node is built from: the test of
+# if and while statements, and the statement itself otherwise.
+def node_key(st):
+    part = st.test if isinstance(st, (ast.If, ast.While)) else st
+    return ast.dump(part), st.lineno
+
+# The AST of the CFG node of a statement (see PyCFG.on_if/on_while)
+def node_ast(st):
+    if isinstance(st, ast.If):
+        return test_ast('_if', st.test)
+    if isinstance(st, ast.While):
+        return test_ast('_while', st.test)
+    return st
+
+class IncrementalLiveness:
+    def __init__(self, src):
+        # statistics of the last analysis: 'full', 'incremental' or
+        # 'unchanged', and the number of node evaluations
+        self.mode = None
+        self.evaluations = 0
+        self.analyze(src)
+
+    # Full analysis of a source
+    def analyze(self, src):
+        src = src.strip()
+        self.module = ast.parse(src)
+        self.stmts, self.shape = flatten(self.module)
+
+        self.cfg = PyCFG()
+        self.cfg.gen_cfg(src)
+        self.graph = FlowGraph.from_pycfg(self.cfg)
+        # node i+1 is the node of statement i (node 0 is start)
+        if self.shape is not None and len(self.graph) != len(self.stmts) + 2:
+            self.shape = None
+
+        self.domain = BitDomain()
+        self.gen = {}
+        self.kill = {}
+        for n in self.graph.nodes():
+            self.encode(n)
+
+        self.solve(order=self.graph.traversal.reverse_cfg_reverse_postorder())
+        self.mode = 'full'
+
+    # (Re-)encode the UEVar and VarKill bit-vectors of a node. Variables
+    # new to the domain get new bits, so the other bit-vectors stay valid.
+    def encode(self, n):
+        instr = self.graph.instruction(n)
+        for v in instr.reads | instr.writes:
+            self.domain.add(v)
+        self.gen[n] = self.domain.encode(instr.reads)
+        self.kill[n] = self.domain.encode(instr.writes)
+
+    def solve(self, order, init=None, worklist=None):
+        successors = {n: self.graph.successors(n) for n in self.graph.nodes()}
+        predecessors = {n: self.graph.predecessors(n) for n in self.graph.nodes()}
+        self.LiveOut, self.evaluations = solve(successors, predecessors, self.gen, self.kill,
+                                               direction="backward", meet=UNION,
+                                               order=order, init=init, worklist=worklist)
+
+    # Analyse a new version of the source, reusing as much as possible of
+    # the previous one. Returns the set of uninitialized variables.
+    def update(self, src):
+        src = src.strip()
+        module = ast.parse(src)
+        stmts, shape = flatten(module)
+
+        if shape is None or shape != self.shape:
+            self.analyze(src)
+            return self.undefined_variables()
+
+        # patch the nodes of the statements that changed
+        changed = []
+        for i, (old, new) in enumerate(zip(self.stmts, stmts)):
+            if node_key(old) == node_key(new):
+                continue
+            n = i + 1
+            cnode = self.cfg.cache[n]
+            cnode.set_ast(node_ast(new))
+            old_instr = self.graph.instrs[n]
+            self.graph.instrs[n] = Instruction(cnode.label(), *cnode.defs_uses())
+            self.graph.asts[n] = cnode.ast_node
+            if self.graph.instrs[n][1:] != old_instr[1:]:
+                changed.append((n, self.gen[n], self.kill[n]))
+                self.encode(n)
+        self.module, self.stmts = module, stmts
+
+        if not changed:
+            self.mode = 'unchanged'
+            self.evaluations = 0
+            return self.undefined_variables()
+
+        # Only the LiveOut of the nodes that reach a changed node can
+        # change. If the changes only add variables to UEVar or remove
+        # them from VarKill, the previous fixed point is below the new
+        # one and the solver can start from it as is. Otherwise the
+        # LiveOut of those nodes is reset first.
+        grows = all(self.gen[n] & old_gen == old_gen and self.kill[n] & old_kill == self.kill[n]
+                    for n, old_gen, old_kill in changed)
+        seeds = set(p for n, _, _ in changed for p in self.graph.predecessors(n))
+        if grows:
+            worklist = seeds
+        else:
+            worklist = set(seeds)
+            stack = list(seeds)
+            while stack:
+                for p in self.graph.predecessors(stack.pop()):
+                    if p not in worklist:
+                        worklist.add(p)
+                        stack.append(p)
+            for n in worklist:
+                self.LiveOut[n] = 0
+
+        self.solve(order=self.graph.traversal.reverse_cfg_reverse_postorder(),
+                   init=self.LiveOut, worklist=worklist)
+        self.mode = 'incremental'
+        return self.undefined_variables()
+
+    def undefined_variables(self):
+        return self.domain.decode(self.LiveOut[self.graph.entry])
+
+# usage: python3 incremental.py <file> <edited file> ...
+# analyses the first file, then each edited version in turn
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pythonfiles', nargs='+', help='successive versions of a python file')
+    args = parser.parse_args()
+    analysis = IncrementalLiveness(slurp(args.pythonfiles[0]))
+    print(args.pythonfiles[0], analysis.mode, analysis.evaluations, analysis.undefined_variables())
+    for f in args.pythonfiles[1:]:
+        undefs = analysis.update(slurp(f))
+        print(f, analysis.mode, analysis.evaluations, undefs)
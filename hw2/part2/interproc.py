@@ -0,0 +1,225 @@
+# Summary-based interprocedural liveness
+#
+# PyCFG links every call to the enter and exit nodes of the function it
+# calls (see PyCFG.link_functions), so the graph find_undefined_variables
+# analyses mixes the locals of every function with the globals, and
+# follows calls from each call site back to every other one.
+#
+# Here every function (and the module body) is analysed on its own
+# graph: the children links of the CFG nodes, which PyCFG builds before
+# it links the functions. Each function f gets a summary:
+#
+#   USE(f)   the globals f (or a function it calls) may read before
+#            writing them: the non-local part of LiveIn at its enter node
+#   KILL(f)  the globals f (or a function it calls) writes on every path
+#            to its exit. Only names declared 'global' in f can be
+#            written.
+#
+# A summary is computed once per function and applied at every node
+# calling it: the node reads USE(f) and writes KILL(f). Summaries are
+# only computed again when the summary of a function they call changes
+# (recursion), until a fixed point. The cost of analysing a module is
+# then one liveness problem per function instead of one over the whole
+# linked graph.
+#
+# The uninitialized variables of a module are the globals live at the
+# start of the module body, and the locals live at the enter node of
+# each function the module body may call.
+#
+# usage: python3 interproc.py <file.py>
+
+import argparse
+import ast
+
+from pycfg.pycfg import PyCFG, slurp
+from pycfg.traversal import Traversal
+from dataflow import BitDomain, UNION, INTERSECTION, solve
+
+class Procedure:
+    """
+    The intraprocedural graph of a function, or of the module body if
+    name is None.
+    """
+    def __init__(self, name, enter, exit, funcdef):
+        self.name = name
+        self.enter = enter
+        self.exit = exit
+        # the nodes reachable from enter along children links
+        self.nodes = [enter]
+        seen = {enter.rid}
+        for n in self.nodes:
+            for c in n.children:
+                if c.rid not in seen:
+                    seen.add(c.rid)
+                    self.nodes.append(c)
+        self.rids = seen
+
+        # the names declared global, and the locals: the names written
+        # in the function (including its arguments)
+        self.declared_globals = set({})
+        self.locals = set({})
+        if name is not None:
+            if funcdef is not None:
+                for st in ast.walk(funcdef):
+                    if isinstance(st, ast.Global):
+                        self.declared_globals |= set(st.names)
+            for n in self.nodes:
+                self.locals |= n.defs_uses()[0]
+            self.locals -= self.declared_globals
+
+        # the summary, as bit-vectors over the module's BitDomain
+        self.use = 0
+        self.kill = 0
+
+        # successors and predecessors by rid, and the traversal orders
+        self.succ = {n.rid: [c.rid for c in n.children] for n in self.nodes}
+        self.pred = {n.rid: [p.rid for p in n.parents if p.rid in self.rids and n in p.children]
+                     for n in self.nodes}
+        self.traversal = Traversal(enter.rid, exit.rid, self.succ.__getitem__, self.pred.__getitem__)
+
+class InterproceduralLiveness:
+    def __init__(self, src):
+        src = src.strip()
+        self.cfg = PyCFG()
+        self.cfg.gen_cfg(src)
+        module = ast.parse(src)
+        funcdefs = {f.lineno: f for f in ast.walk(module) if isinstance(f, ast.FunctionDef)}
+
+        self.procedures = {}
+        for fname, (enter, exit) in self.cfg.functions.items():
+            self.procedures[fname] = Procedure(fname, enter, exit, funcdefs.get(enter.lineno()))
+        self.main = Procedure(None, self.cfg.founder, self.cfg.last_node, None)
+
+        self.domain = BitDomain()
+        for cnode in self.cfg.cache.values():
+            for v in cnode.defs_uses()[0] | cnode.defs_uses()[1]:
+                self.domain.add(v)
+        for proc in self.procedures.values():
+            for v in proc.declared_globals:
+                self.domain.add(v)
+        for proc in self.procedures.values():
+            proc.local_bits = self.domain.encode(proc.locals)
+
+        self.evaluations = 0
+        self.compute_summaries()
+        self.LiveIn = {None: self.live_in(self.main)}
+        for fname, proc in self.procedures.items():
+            self.LiveIn[fname] = self.live_in(proc)
+
+    # the functions called by a node, that the module defines
+    def callees(self, cnode):
+        return [self.procedures[f] for f in cnode.calls if f in self.procedures]
+
+    # The gen (read) and kill (written) bit-vectors of each node of a
+    # procedure, with the summaries of the functions it calls
+    def transfer(self, proc):
+        gen = {}
+        kill = {}
+        for cnode in proc.nodes:
+            writes, reads = cnode.defs_uses()
+            gen[cnode.rid] = self.domain.encode(reads)
+            kill[cnode.rid] = self.domain.encode(writes)
+            # the call happens after the node reads its operands and
+            # before it writes its target
+            for callee in self.callees(cnode):
+                gen[cnode.rid] |= callee.use
+                kill[cnode.rid] |= callee.kill
+        return gen, kill
+
+    # LiveIn at the enter node of a procedure
+    def live_in(self, proc):
+        gen, kill = self.transfer(proc)
+        LiveOut, evaluations = solve(proc.succ, proc.pred, gen, kill, direction="backward", meet=UNION,
+                                     order=proc.traversal.reverse_cfg_reverse_postorder())
+        self.evaluations += evaluations
+        rid = proc.enter.rid
+        return gen[rid] | (LiveOut[rid] & ~kill[rid])
+
+    # The globals written on every path from the enter node to the exit
+    # node of a function, by the function or by the functions it calls
+    def must_kill(self, proc):
+        non_locals = self.domain.full() & ~proc.local_bits
+        gen, kill = self.transfer(proc)
+        for rid in gen:
+            gen[rid] = kill[rid] & non_locals
+            kill[rid] = 0
+        Defined, evaluations = solve(proc.succ, proc.pred, gen, kill, direction="forward",
+                                     meet=INTERSECTION, top=non_locals,
+                                     order=proc.traversal.reverse_postorder())
+        self.evaluations += evaluations
+        rid = proc.exit.rid
+        if rid not in Defined:
+            # the exit is never reached
+            return non_locals
+        return gen[rid] | Defined[rid]
+
+    # Compute the summaries of every function. KILL only depends on the
+    # KILL of the callees, so it is computed first: it starts from every
+    # non-local name and shrinks to the greatest fixed point. USE then
+    # grows from nothing. Without 'global' declarations, KILL is empty.
+    def compute_summaries(self):
+        callers = {fname: set({}) for fname in self.procedures}
+        for fname, proc in self.procedures.items():
+            for cnode in proc.nodes:
+                for callee in self.callees(cnode):
+                    callers[callee.name].add(fname)
+
+        if any(proc.declared_globals for proc in self.procedures.values()):
+            for proc in self.procedures.values():
+                proc.kill = self.domain.full() & ~proc.local_bits
+            self.propagate(callers, 'kill', self.must_kill)
+        self.propagate(callers, 'use', lambda proc: self.live_in(proc) & ~proc.local_bits)
+
+    # Recompute one part of the summaries (attr) until nothing changes,
+    # re-queueing the callers of a function whenever its summary changes
+    def propagate(self, callers, attr, compute):
+        worklist = list(self.procedures)
+        queued = set(worklist)
+        while worklist:
+            fname = worklist.pop()
+            queued.discard(fname)
+            proc = self.procedures[fname]
+            value = compute(proc)
+            if value != getattr(proc, attr):
+                setattr(proc, attr, value)
+                for caller in callers[fname]:
+                    if caller not in queued:
+                        queued.add(caller)
+                        worklist.append(caller)
+
+    # the summary of a function, as sets of names
+    def summary(self, fname):
+        proc = self.procedures[fname]
+        return self.domain.decode(proc.use), self.domain.decode(proc.kill)
+
+    # the functions that may be called when the module body runs
+    def reachable_functions(self):
+        reached = set({})
+        stack = [self.main]
+        while stack:
+            proc = stack.pop()
+            for cnode in proc.nodes:
+                for callee in self.callees(cnode):
+                    if callee.name not in reached:
+                        reached.add(callee.name)
+                        stack.append(callee)
+        return reached
+
+    def undefined_variables(self):
+        undefined = self.domain.decode(self.LiveIn[None])
+        for fname in self.reachable_functions():
+            undefined |= self.domain.decode(self.LiveIn[fname] & self.procedures[fname].local_bits)
+        return undefined
+
+def find_undefined_variables_interprocedural(input_python_file):
+    return InterproceduralLiveness(slurp(input_python_file)).undefined_variables()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pythonfile', help='The python file to be analyzed')
+    args = parser.parse_args()
+    analysis = InterproceduralLiveness(slurp(args.pythonfile))
+    for fname in sorted(analysis.procedures):
+        use, kill = analysis.summary(fname)
+        print("%s: USE = %s, KILL = %s" % (fname, sorted(use), sorted(kill)))
+    print(analysis.undefined_variables())
@@ -1,4 +1,4 @@
-from pycfg.pycfg import PyCFG, CFGNode, slurp 
+from pycfg.pycfg import PyCFG, slurp 
 import argparse
 
 #Acks:
@@ -9,10 +9,15 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser() 
   
     parser.add_argument('pythonfile', help ='The python file to be analyzed') 
+    parser.add_argument('--dot', action='store_true', help='write the graph as <pythonfile>.dot text instead of rendering a png (does not need pygraphviz)')
     args = parser.parse_args() 
     arcs = [] 
   
     cfg = PyCFG() 
     cfg.gen_cfg(slurp(args.pythonfile).strip()) 
-    g = CFGNode.to_graph(arcs) 
-    g.draw(args.pythonfile + '.png', prog ='dot')
+    if args.dot:
+        with open(args.pythonfile + '.dot', 'w') as f:
+            f.write(cfg.to_dot(arcs))
+    else:
+        g = cfg.to_graph(arcs) 
+        g.draw(args.pythonfile + '.png', prog ='dot')
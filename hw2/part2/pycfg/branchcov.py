@@ -1,6 +1,8 @@
 import sys
-import inspect
+import linecache
 import re
+from array import array
+from collections import Counter
 
 # these control flow contstructs have conditionals we can evaluate
 Control_Flow = ['if', 'elif', 'while', 'for']
@@ -8,45 +10,64 @@ Control_Flow_Re = [re.compile(r'^ *%s +(.+) *: *' % i) for i in Control_Flow]
 # else, continue, break, and pass do not have conditionals
 # that can be evaluated.
 
+# Lines are filtered when they are traced: whether a code object
+# belongs to the file asked for is decided once per code object, and
+# frames of other files are not traced at all. Each distinct
+# (prev file, file, prev line, line) arc is stored once, with the
+# number of times it was taken, and each line only keeps the locals of
+# its last visit (not the globals, which would be copied on every
+# line), so the memory used is bounded by the number of distinct arcs
+# and lines rather than by the length of the run.
 def traceit(frame, event, arg):
+    code = frame.f_code
+    include = traceit.include.get(code)
+    if include is None:
+        include = traceit.include[code] = traceit.fsrc in code.co_filename
+    if not include:
+        # the next traced line is entered from another file
+        traceit.pfname = None
+        traceit.prevline = 0
+        return None
     if event in ['call', 'return', 'line']:
-        fname, line = frame.f_code.co_filename, frame.f_lineno
-        myvars = {**frame.f_globals, **frame.f_locals} # should we do deep copy?
-        finfo = inspect.getframeinfo(frame)
-        src = finfo.code_context[finfo.index]
-        matches = (ctrl.match(src) for ctrl in Control_Flow_Re)
-        conditional = next((m.group(1) for m in matches if m), None)
-
-        traceit.cov_arcs.append((traceit.pfname, fname, traceit.prevline, line, conditional, myvars))
-        traceit.prevline = line
+        fname, line = code.co_filename, frame.f_lineno
+        myvars = dict(frame.f_locals) # should we do deep copy?
+        conditional = conditional_lines(fname).get(line)
+
+        traceit.arc_counts[(traceit.pfname, fname, traceit.prevline, line)] += 1
+        traceit.lines[(fname, line)] = (conditional, myvars)
         traceit.pfname = fname
+        traceit.prevline = line
     else: pass # 'exception'
     return traceit
 
 def capture_coverage(fn, fsrc):
-    traceit.cov_arcs = []
-    traceit.prevline = 0
+    traceit.fsrc = fsrc
+    traceit.include = {}
+    traceit.arc_counts = Counter()
+    traceit.lines = {}
     traceit.pfname = None
+    traceit.prevline = 0
     oldtrace = sys.gettrace()
     sys.settrace(traceit)
-    fn()
-    sys.settrace(oldtrace)
+    try:
+        fn()
+    finally:
+        sys.settrace(oldtrace)
     branch_cov = {}
     source_code = {}
     cov_arcs = []
-    for pf, f,i,j,conditional,l in traceit.cov_arcs:
-        # if the current file is not asked file, skip
-        if fsrc not in f: continue
-        # if the previous file was not asked file, set prevline to 0
-        if fsrc not in pf: i = 0
+    for (pf, f, i, j), count in traceit.arc_counts.items():
         # dont count branch_cov of 0th line
         if i != 0:
             branch_cov.setdefault(i, set()).add(j)
+        conditional, l = traceit.lines[(f, j)]
         source_code[j] = (f, conditional, l)
         cov_arcs.append((f, i, j, conditional, l))
 
     # return format:
-    #     of cov_arcs:
+    #     of cov_arcs (each distinct arc once, in the order they were
+    #     first taken; traceit.arc_counts has the number of times each
+    #     (<parent file>, <file>, <parent>, <child>) arc was taken):
     #      (<filename>, <parent>, <child>, <condstr> if line is a coditional else <None>, <local variables>)
     #     of branch_cov:
     #      {<parent>: <set of children>}
@@ -54,12 +75,185 @@ def capture_coverage(fn, fsrc):
     #       {<lineno>: (<filename>, <condstr> if conditional, <locals>)}
     return (cov_arcs, source_code, branch_cov)
 
+# Low overhead coverage mode
+#
+# Instead of reading the source line and matching the regexes on every
+# traced line, the conditional lines of a file are found once, and each
+# traced line only appends the id of its (prev, cur) arc to an array.
+# Locals are only copied when a snapshot is asked for. On python 3.12+
+# sys.monitoring LINE events are used instead of sys.settrace.
+
+# filename -> {lineno: conditional string}, computed once per file
+Conditionals = {}
+
+def conditional_lines(fname):
+    if fname not in Conditionals:
+        conds = {}
+        for lineno, src in enumerate(linecache.getlines(fname), 1):
+            matches = (ctrl.match(src) for ctrl in Control_Flow_Re)
+            conditional = next((m.group(1) for m in matches if m), None)
+            if conditional is not None:
+                conds[lineno] = conditional
+        Conditionals[fname] = conds
+    return Conditionals[fname]
+
+# code object -> {bytecode offset: lineno}, for sys.monitoring events
+# that report offsets
+Offset_Lines = {}
+
+def offset_line(code, offset):
+    if code not in Offset_Lines:
+        lines = {}
+        for start, end, lineno in code.co_lines():
+            for o in range(start, end, 2):
+                lines[o] = lineno
+        Offset_Lines[code] = lines
+    return Offset_Lines[code].get(offset, code.co_firstlineno)
+
+class ArcTrace:
+    """
+    The arcs of a run. Each distinct (prev file, file, prev line, line)
+    arc gets an id, and the run is recorded as the sequence of arc ids
+    in a preallocated array that doubles when full.
+    """
+    def __init__(self, snapshot=False, capacity=1 << 16):
+        self.snapshot = snapshot
+        self.arc_ids = {}
+        self.arcs = []
+        self.trace = array('i', [0]) * capacity
+        self.n = 0
+        self.snapshots = []
+        self.pfname = None
+        self.prevline = 0
+
+    def record(self, fname, line, frame=None):
+        key = (self.pfname, fname, self.prevline, line)
+        i = self.arc_ids.get(key)
+        if i is None:
+            i = self.arc_ids[key] = len(self.arcs)
+            self.arcs.append(key)
+        if self.n == len(self.trace):
+            self.trace.extend(array('i', [0]) * len(self.trace))
+        self.trace[self.n] = i
+        self.n += 1
+        if self.snapshot:
+            self.snapshots.append(dict(frame.f_locals) if frame is not None else None)
+        self.pfname = fname
+        self.prevline = line
+
+    def events(self):
+        """(prev file, file, prev line, line, locals) in execution order"""
+        for k in range(self.n):
+            pf, f, i, j = self.arcs[self.trace[k]]
+            yield pf, f, i, j, self.snapshots[k] if self.snapshot else None
+
+def _settrace_run(fn, tracer):
+    def local_trace(frame, event, arg):
+        if event in ('line', 'return'):
+            tracer.record(frame.f_code.co_filename, frame.f_lineno, frame)
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if event == 'call':
+            tracer.record(frame.f_code.co_filename, frame.f_lineno, frame)
+            return local_trace
+        return None
+
+    oldtrace = sys.gettrace()
+    sys.settrace(global_trace)
+    try:
+        fn()
+    finally:
+        sys.settrace(oldtrace)
+
+# The first sys.monitoring tool id no other tool (e.g. coverage.py or a
+# debugger) uses, claimed for branchcov, or None if they are all taken
+def _claim_tool_id(mon):
+    for tool in [mon.COVERAGE_ID] + list(range(6)):
+        if mon.get_tool(tool) is None:
+            try:
+                mon.use_tool_id(tool, 'branchcov')
+                return tool
+            except ValueError:
+                # claimed by another tool in the meantime
+                continue
+    return None
+
+# Run fn under sys.monitoring. Returns False, without running fn, if no
+# tool id is free.
+def _monitoring_run(fn, tracer):
+    mon = sys.monitoring
+    events = mon.events
+
+    def frame():
+        # the frame of the code that caused the event
+        return sys._getframe(2) if tracer.snapshot else None
+
+    def on_start(code, offset):
+        # the line of the first instruction, like the 'call' event of
+        # settrace (0 for a module)
+        tracer.record(code.co_filename, offset_line(code, offset), frame())
+
+    def on_line(code, line):
+        tracer.record(code.co_filename, line, frame())
+
+    def on_return(code, offset, retval):
+        tracer.record(code.co_filename, offset_line(code, offset), frame())
+
+    def on_unwind(code, offset, exc):
+        # a frame left by an exception, which settrace also reports as
+        # a 'return' event
+        tracer.record(code.co_filename, offset_line(code, offset), frame())
+
+    tool = _claim_tool_id(mon)
+    if tool is None:
+        return False
+    callbacks = {events.PY_START: on_start, events.LINE: on_line, events.PY_RETURN: on_return,
+                 events.PY_UNWIND: on_unwind}
+    try:
+        for event, callback in callbacks.items():
+            mon.register_callback(tool, event, callback)
+        mon.set_events(tool, events.PY_START | events.LINE | events.PY_RETURN | events.PY_UNWIND)
+        fn()
+    finally:
+        mon.set_events(tool, 0)
+        for event in callbacks:
+            mon.register_callback(tool, event, None)
+        mon.free_tool_id(tool)
+    return True
+
+def capture_coverage_fast(fn, fsrc, snapshot=False):
+    """
+    Same as capture_coverage, in the low overhead mode. The locals in
+    the results are None unless snapshot is set, in which case they
+    only contain the local variables of the frame (not its globals).
+    """
+    tracer = ArcTrace(snapshot)
+    # sys.monitoring (python 3.12+) if a tool id is free, else settrace
+    if not (hasattr(sys, 'monitoring') and _monitoring_run(fn, tracer)):
+        _settrace_run(fn, tracer)
+
+    branch_cov = {}
+    source_code = {}
+    cov_arcs = []
+    for pf, f, i, j, l in tracer.events():
+        if fsrc not in f: continue
+        if pf is None or fsrc not in pf: i = 0
+        if i != 0:
+            branch_cov.setdefault(i, set()).add(j)
+        conditional = conditional_lines(f).get(j)
+        source_code[j] = (f, conditional, l)
+        cov_arcs.append((f, i, j, conditional, l))
+    return (cov_arcs, source_code, branch_cov)
+
+# usage: branchcov.py <file.py> [<method> [<arg>]] [--fast]
 if __name__ == '__main__':
     import json
     from importlib.machinery import SourceFileLoader
     v = SourceFileLoader('', sys.argv[1]).load_module()
     method = sys.argv[2] if len(sys.argv) > 2 else 'main'
     arg = sys.argv[3] if len(sys.argv) > 3 else '%20abc'
-    arcs, source, bcov = capture_coverage(lambda: getattr(v, method)(arg), sys.argv[1])
+    capture = capture_coverage_fast if '--fast' in sys.argv else capture_coverage
+    arcs, source, bcov = capture(lambda: getattr(v, method)(arg), sys.argv[1])
     cov = [ (i,j) for f,i,j,src,l in arcs]
     print(json.dumps(cov), file=sys.stderr)
@@ -0,0 +1,73 @@
+"""
+An on-disk cache for the graphs built from a source file.
+
+Building a CFG parses the source, walks the AST with PyCFG and unparses
+every node, which dominates the time of an analysis. The compact data
+of a graph (see FlowGraph.to_data and get_cfg) only holds ids, edges,
+line numbers, labels and variable sets, so it is stored with marshal,
+in a file named by a hash of:
+
+    ANALYZER_VERSION, the python version (marshal files are not
+    portable across versions), the kind of graph, and the source text
+
+so a changed file, or a new analyzer, never gets a stale graph.
+
+The cache is off unless a directory is given, either explicitly
+(cache_dir=...) or in the CFG_CACHE_DIR environment variable.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+# Bump this whenever the CFG construction or the decoded node data
+# changes, so the graphs cached by older versions are not used.
+ANALYZER_VERSION = 1
+
+CACHE_DIR_ENV = 'CFG_CACHE_DIR'
+
+def get_cache_dir(cache_dir=None):
+    """The cache directory to use, or None if caching is off"""
+    return cache_dir if cache_dir is not None else os.environ.get(CACHE_DIR_ENV) or None
+
+def cache_key(kind, src):
+    h = hashlib.sha256()
+    h.update(('%d\0%s\0%s\0' % (ANALYZER_VERSION, sys.version, kind)).encode())
+    h.update(src.encode())
+    return h.hexdigest()
+
+def cached(kind, src, build, cache_dir=None):
+    """
+    Return build(), the marshal-able data of the 'kind' graph of src,
+    loading it from the cache directory if it was stored before, and
+    storing it otherwise.
+    """
+    directory = get_cache_dir(cache_dir)
+    if directory is None:
+        return build()
+
+    path = os.path.join(directory, cache_key(kind, src) + '.bin')
+    try:
+        with open(path, 'rb') as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        # not cached yet, or unreadable: build it again
+        pass
+
+    data = build()
+    # write to a temporary file first, so that concurrent runs (e.g.
+    # batch.py --jobs) never read a partial file
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            marshal.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        # the directory cannot be written: the data is just not cached
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return data
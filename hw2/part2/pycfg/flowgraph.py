@@ -0,0 +1,131 @@
+"""
+An in-memory CFG for analyses, built directly from a PyCFG.
+
+Nodes are integer ids 0..N-1 (in CFGNode creation order, so the start
+node is 0 and the stop node is N-1), successors and predecessors are
+stored as adjacency lists, and the variables written and read by every
+node are decoded once from its AST (see CFGNode.defs_uses). Nothing
+here needs pygraphviz, which is only used to render graphs (see
+PyCFG.to_graph and print_dot.py).
+"""
+
+import ast
+from collections import namedtuple
+
+try:
+    # run as a script from the pycfg directory
+    from traversal import Traversal
+except ImportError:
+    # imported as pycfg.flowgraph
+    from pycfg.traversal import Traversal
+
+# label:  the node label, as shown in the rendered graph, e.g. "3: x = y"
+# writes: the set of variable names written by the node (its defs)
+# reads:  the set of variable names read by the node (its uses)
+Instruction = namedtuple('Instruction', ['label', 'writes', 'reads'])
+
+class SourceASTs(list):
+    """
+    The ASTs of the nodes of a graph loaded with FlowGraph.from_data,
+    parsed from the source of each node the first time they are used.
+    """
+    def __init__(self, sources):
+        super().__init__([None] * len(sources))
+        self.sources = sources
+
+    def __getitem__(self, n):
+        node = super().__getitem__(n)
+        if node is None:
+            node = ast.parse(self.sources[n]).body[0]
+            self[n] = node
+        return node
+
+class FlowGraph:
+    def __init__(self, instrs, edges, entry, exit, asts=None, branches=None):
+        """
+        instrs: the Instruction of each node, indexed by node id
+        edges: (parent id, child id) pairs
+        entry, exit: the ids of the start and stop nodes
+        asts: the AST of each node, for passes that evaluate
+              expressions (see sccp.py), or None
+        branches: if and while test node id -> (the successors taken
+                  when the test is true, those taken when it is false)
+        """
+        n = len(instrs)
+        self.instrs = instrs
+        self.asts = asts
+        self.branches = branches if branches is not None else {}
+        # the source of each node, if the graph was built from a PyCFG
+        self.sources = None
+        self.succ = [[] for _ in range(n)]
+        self.pred = [[] for _ in range(n)]
+        for p, c in edges:
+            if c not in self.succ[p]:
+                self.succ[p].append(c)
+                self.pred[c].append(p)
+        self.entry = entry
+        self.exit = exit
+        self.traversal = Traversal(entry, exit, self.successors, self.predecessors)
+
+    @classmethod
+    def from_pycfg(cls, cfg):
+        """
+        Build the graph of a PyCFG after gen_cfg().
+        """
+        cache = cfg.cache
+        rids = sorted(cache)
+        ids = {rid: i for i, rid in enumerate(rids)}
+        instrs = [Instruction(cache[rid].label(), *cache[rid].defs_uses()) for rid in rids]
+        edges = [(ids[p.rid], ids[rid]) for rid in rids for p in cache[rid].parents]
+        asts = [cache[rid].ast_node for rid in rids]
+        graph = cls(instrs, edges, ids[cfg.founder.rid], ids[cfg.last_node.rid], asts)
+        graph.sources = [cache[rid].source() for rid in rids]
+        for rid in rids:
+            body = getattr(cache[rid], 'body_rids', None)
+            if body is None:
+                continue
+            n = ids[rid]
+            true = [s for s in graph.succ[n] if rids[s] in body]
+            # an empty true list means the body starts with a node
+            # that is not a child of the test (e.g. a function
+            # definition), so the branch is not known
+            if true:
+                graph.branches[n] = (true, [s for s in graph.succ[n] if s not in true])
+        return graph
+
+    def to_data(self):
+        """
+        The graph as plain tuples, lists, sets and dicts (e.g. for
+        marshal, see cfgcache.py). The ASTs are kept as source text.
+        """
+        # in the order the edges were added, so the adjacency lists are
+        # rebuilt in the same order
+        edges = [(p, c) for c in self.nodes() for p in self.pred[c]]
+        sources = self.sources if self.sources is not None else []
+        return (list(map(tuple, self.instrs)), edges, self.entry, self.exit, self.branches, sources)
+
+    @classmethod
+    def from_data(cls, data):
+        instrs, edges, entry, exit, branches, sources = data
+        asts = SourceASTs(sources) if sources else None
+        graph = cls([Instruction(*i) for i in instrs], edges, entry, exit, asts, branches)
+        graph.sources = sources or None
+        return graph
+
+    def __len__(self):
+        return len(self.instrs)
+
+    def nodes(self):
+        return range(len(self.instrs))
+
+    def get_node(self, i):
+        return i
+
+    def successors(self, n):
+        return self.succ[n]
+
+    def predecessors(self, n):
+        return self.pred[n]
+
+    def instruction(self, n):
+        return self.instrs[n]
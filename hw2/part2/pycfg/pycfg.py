@@ -9,21 +9,81 @@ Use http://viz-js.com/ to view digraph output
 import ast
 import re
 import astunparse
-import pygraphviz
+
+try:
+    # run as a script from the pycfg directory
+    from traversal import Traversal
+    from cfgcache import cached
+except ImportError:
+    # imported as pycfg.pycfg
+    from pycfg.traversal import Traversal
+    from pycfg.cfgcache import cached
+
+def unhack(v):
+    for i in ['if', 'while', 'for', 'elif']:
+        v = re.sub(r'^_%s:' % i, '%s:' % i, v)
+    return v
+
+# labels of the synthetic nodes that PyCFG parses as 'label: expr'
+Test_Labels = {'_if', '_while', '_for'}
+Function_Labels = {'enter', 'exit'}
+
+def names_in(node):
+    """
+    The variable names stored and loaded in an AST, ignoring the names
+    of called functions (e.g. 'input' in input()).
+    """
+    called = set(id(c.func) for c in ast.walk(node) if isinstance(c, ast.Call) and isinstance(c.func, ast.Name))
+    stored, loaded = set(), set()
+    for n in ast.walk(node):
+        if isinstance(n, ast.Name) and id(n) not in called:
+            if isinstance(n.ctx, ast.Store):
+                stored.add(n.id)
+            elif isinstance(n.ctx, ast.Load):
+                loaded.add(n.id)
+    return stored, loaded
+
+def decode_defs_uses(cnode):
+    """
+    Decode the variables written (defs) and read (uses) by a CFGNode.
+    """
+    node = cnode.ast_node
+    if getattr(cnode, 'sentinel', False):
+        # start and stop
+        return frozenset(), frozenset()
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        label = node.target.id
+        if label in Test_Labels:
+            # _if: <test>, _while: <test>, _for: True if <iter> else False
+            return frozenset(), frozenset(names_in(node.annotation)[1])
+        if label in Function_Labels:
+            # enter: f(<args>) defines the arguments, exit: f(<args>) does nothing
+            args = node.annotation.args if isinstance(node.annotation, ast.Call) else []
+            params = [a.id for a in args if isinstance(a, ast.Name)]
+            return frozenset(params if label == 'enter' else []), frozenset()
+    stored, loaded = names_in(node)
+    if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+        # x += y reads x as well
+        loaded.add(node.target.id)
+    return frozenset(stored), frozenset(loaded)
+
+def test_ast(label, test):
+    """
+    The AST of the node of an if or while test: '_if: <test>' or
+    '_while: <test>', located at the test.
+    """
+    node = ast.parse('%s: %s' % (label, astunparse.unparse(test).strip())).body[0]
+    ast.copy_location(node, test)
+    return node
 
 class CFGNode(dict):
-    registry = 0
-    cache = {}
-    stack = []
-    def __init__(self, parents=[], ast=None):
+    def __init__(self, parents=[], ast=None, rid=0):
         assert type(parents) is list
         self.parents = parents
         self.calls = []
         self.children = []
         self.ast_node = ast
-        self.rid  = CFGNode.registry
-        CFGNode.cache[self.rid] = self
-        CFGNode.registry += 1
+        self.rid  = rid
 
     def lineno(self):
         return self.ast_node.lineno if hasattr(self.ast_node, 'lineno') else 0
@@ -58,57 +118,132 @@ class CFGNode(dict):
     def add_calls(self, func):
         self.calls.append(func)
 
+    def set_ast(self, ast):
+        """
+        Replace the AST of the node, e.g. after an edit of its statement,
+        dropping everything decoded from the previous one.
+        """
+        self.ast_node = ast
+        self.__dict__.pop('_defs_uses', None)
+        self.__dict__.pop('_source', None)
+
     def source(self):
-        return astunparse.unparse(self.ast_node).strip()
+        # unparsing is slow and the source is needed by __str__,
+        # label() and to_json(), so it is computed once per node
+        if not hasattr(self, '_source'):
+            self._source = astunparse.unparse(self.ast_node).strip()
+        return self._source
+
+    def defs_uses(self):
+        """
+        The (defs, uses) of the node: the sets of variable names it
+        writes and reads, decoded once from the AST and cached.
+        """
+        if not hasattr(self, '_defs_uses'):
+            self._defs_uses = decode_defs_uses(self)
+        return self._defs_uses
+
+    def label(self):
+        return "%d: %s" % (self.lineno(), unhack(self.source()))
 
     def to_json(self):
         return {'id':self.rid, 'parents': [p.rid for p in self.parents], 'children': [c.rid for c in self.children], 'calls': self.calls, 'at':self.lineno() ,'ast':self.source()}
 
-    @classmethod
-    def to_graph(cls, arcs=[]):
-        def unhack(v):
-            for i in ['if', 'while', 'for', 'elif']:
-                v = re.sub(r'^_%s:' % i, '%s:' % i, v)
-            return v
-        G = pygraphviz.AGraph(directed=True)
+class PyCFG:
+    """
+    The python CFG
+    """
+    def __init__(self):
+        # the nodes of this graph: rid -> CFGNode. rids start at 0 for
+        # every graph, so PyCFG instances are independent of each other.
+        self.cache = {}
+        self.registry = 0
+        self.founder = self.new_node(parents=[], ast=ast.parse('start').body[0]) # sentinel
+        self.founder.ast_node.lineno = 0
+        self.founder.sentinel = True
+        self.functions = {}
+        self.functions_node = {}
+
+    def new_node(self, parents=[], ast=None):
+        node = CFGNode(parents=parents, ast=ast, rid=self.registry)
+        self.cache[node.rid] = node
+        self.registry += 1
+        return node
+
+    def edges(self, arcs=[]):
+        """
+        The edges of the graph as (parent rid, child rid, attributes),
+        colored by the coverage arcs if any are given: blue if the edge
+        was taken, red otherwise. Used by to_graph() and to_dot().
+        """
+        arcs = set(arcs)
         cov_lines = set(i for i,j in arcs)
-        for nid, cnode in CFGNode.cache.items():
-            G.add_node(cnode.rid)
-            n = G.get_node(cnode.rid)
+        # coverage state of each exit node, computed once per node
+        exit_covered = {}
+        for nid, cnode in self.cache.items():
             lineno = cnode.lineno()
-            n.attr['label'] = "%d: %s" % (lineno, unhack(cnode.source()))
+            is_callee = hasattr(cnode, 'calleelink')
             for pn in cnode.parents:
                 plineno = pn.lineno()
-                if hasattr(pn, 'calllink') and pn.calllink > 0 and not hasattr(cnode, 'calleelink'):
-                    G.add_edge(pn.rid, cnode.rid, style='dotted', weight=100)
+                if hasattr(pn, 'calllink') and pn.calllink > 0 and not is_callee:
+                    yield pn.rid, cnode.rid, {'style': 'dotted', 'weight': 100}
                     continue
 
                 if arcs:
+                    if hasattr(pn, 'fn_exit_node') and pn.rid not in exit_covered:
+                        exit_covered[pn.rid] = len(set(n.lineno() for n in pn.parents) | cov_lines) > 0
                     if  (plineno, lineno) in arcs:
-                        G.add_edge(pn.rid, cnode.rid, color='blue')
+                        yield pn.rid, cnode.rid, {'color': 'blue'}
                     elif plineno == lineno and lineno in cov_lines:
-                        G.add_edge(pn.rid, cnode.rid, color='blue')
+                        yield pn.rid, cnode.rid, {'color': 'blue'}
                     elif hasattr(cnode, 'fn_exit_node') and plineno in cov_lines:  # child is exit and parent is covered
-                        G.add_edge(pn.rid, cnode.rid, color='blue')
-                    elif hasattr(pn, 'fn_exit_node') and len(set(n.lineno() for n in pn.parents) | cov_lines) > 0: # parent is exit and one of its parents is covered.
-                        G.add_edge(pn.rid, cnode.rid, color='blue')
-                    elif plineno in cov_lines and hasattr(cnode, 'calleelink'): # child is a callee (has calleelink) and one of the parents is covered.
-                        G.add_edge(pn.rid, cnode.rid, color='blue')
+                        yield pn.rid, cnode.rid, {'color': 'blue'}
+                    elif hasattr(pn, 'fn_exit_node') and exit_covered[pn.rid]: # parent is exit and one of its parents is covered.
+                        yield pn.rid, cnode.rid, {'color': 'blue'}
+                    elif plineno in cov_lines and is_callee: # child is a callee (has calleelink) and one of the parents is covered.
+                        yield pn.rid, cnode.rid, {'color': 'blue'}
                     else:
-                        G.add_edge(pn.rid, cnode.rid, color='red')
+                        yield pn.rid, cnode.rid, {'color': 'red'}
                 else:
-                    G.add_edge(pn.rid, cnode.rid)
+                    yield pn.rid, cnode.rid, {}
+
+    def to_graph(self, arcs=[]):
+        # pygraphviz is only needed for rendering, not for analysis
+        import pygraphviz
+        G = pygraphviz.AGraph(directed=True)
+        for nid, cnode in self.cache.items():
+            G.add_node(cnode.rid)
+            G.get_node(cnode.rid).attr['label'] = cnode.label()
+        for p, c, attrs in self.edges(arcs):
+            G.add_edge(p, c, **attrs)
         return G
 
-class PyCFG:
-    """
-    The python CFG
-    """
-    def __init__(self):
-        self.founder = CFGNode(parents=[], ast=ast.parse('start').body[0]) # sentinel
-        self.founder.ast_node.lineno = 0
-        self.functions = {}
-        self.functions_node = {}
+    def to_dot(self, arcs=[]):
+        """
+        The same graph as to_graph(), as DOT text, without pygraphviz.
+        Like to_graph() the graph is strict: an edge added twice is
+        only written once, with the attributes of the last one.
+        """
+        def quote(s):
+            return '"%s"' % str(s).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def attr_list(attrs):
+            return ', '.join('%s=%s' % (k, quote(v)) for k, v in attrs.items())
+
+        edges = {}
+        for p, c, attrs in self.edges(arcs):
+            edges.setdefault((p, c), {}).update(attrs)
+
+        lines = ['strict digraph {']
+        for nid, cnode in self.cache.items():
+            lines.append('\t%d [label=%s];' % (cnode.rid, quote(cnode.label())))
+        for (p, c), attrs in edges.items():
+            if attrs:
+                lines.append('\t%d -> %d [%s];' % (p, c, attr_list(attrs)))
+            else:
+                lines.append('\t%d -> %d;' % (p, c))
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
 
     def parse(self, src):
         return ast.parse(src)
@@ -143,13 +278,13 @@ class PyCFG:
         """
         if len(node.targets) > 1: raise NotImplemented('Parallel assignments')
 
-        p = [CFGNode(parents=myparents, ast=node)]
+        p = [self.new_node(parents=myparents, ast=node)]
         p = self.walk(node.value, p)
 
         return p
 
     def on_pass(self, node, myparents):
-        return [CFGNode(parents=myparents, ast=node)]
+        return [self.new_node(parents=myparents, ast=node)]
 
     def on_break(self, node, myparents):
         parent = myparents[0]
@@ -158,7 +293,7 @@ class PyCFG:
             parent = parent.parents[0]
 
         assert hasattr(parent, 'exit_nodes')
-        p = CFGNode(parents=myparents, ast=node)
+        p = self.new_node(parents=myparents, ast=node)
 
         # make the break one of the parents of label node.
         parent.exit_nodes.append(p)
@@ -172,7 +307,7 @@ class PyCFG:
             # we have ordered parents
             parent = parent.parents[0]
         assert hasattr(parent, 'exit_nodes')
-        p = CFGNode(parents=myparents, ast=node)
+        p = self.new_node(parents=myparents, ast=node)
 
         # make continue one of the parents of the original test node.
         parent.add_parent(p)
@@ -183,14 +318,14 @@ class PyCFG:
 
     def on_for(self, node, myparents):
         #node.target in node.iter: node.body
-        _test_node = CFGNode(parents=myparents, ast=ast.parse('_for: True if %s else False' % astunparse.unparse(node.iter).strip()).body[0])
+        _test_node = self.new_node(parents=myparents, ast=ast.parse('_for: True if %s else False' % astunparse.unparse(node.iter).strip()).body[0])
         ast.copy_location(_test_node.ast_node, node)
 
         # we attach the label node here so that break can find it.
         _test_node.exit_nodes = []
         test_node = self.walk(node.iter, [_test_node])
 
-        extract_node = CFGNode(parents=[_test_node], ast=ast.parse('%s = %s.shift()' % (astunparse.unparse(node.target).strip(), astunparse.unparse(node.iter).strip())).body[0])
+        extract_node = self.new_node(parents=[_test_node], ast=ast.parse('%s = %s.shift()' % (astunparse.unparse(node.target).strip(), astunparse.unparse(node.iter).strip())).body[0])
         ast.copy_location(extract_node.ast_node, _test_node.ast_node)
 
         # now we evaluate the body, one at a time.
@@ -206,17 +341,20 @@ class PyCFG:
 
     def on_while(self, node, myparents):
         # For a while, the earliest parent is the node.test
-        _test_node = CFGNode(parents=myparents, ast=ast.parse('_while: %s' % astunparse.unparse(node.test).strip()).body[0])
-        ast.copy_location(_test_node.ast_node, node.test)
+        _test_node = self.new_node(parents=myparents, ast=test_ast('_while', node.test))
         _test_node.exit_nodes = []
         test_node = self.walk(node.test, [_test_node])
 
         # we attach the label node here so that break can find it.
 
         # now we evaluate the body, one at a time.
+        start = self.registry
         p1 = test_node
         for n in node.body:
             p1 = self.walk(n, p1)
+        # the children of the test among the body nodes are taken when
+        # the test is true
+        _test_node.body_rids = range(start, self.registry)
 
         # the test node is looped back at the end of processing.
         _test_node.add_parents(p1)
@@ -225,12 +363,14 @@ class PyCFG:
         return _test_node.exit_nodes + test_node
 
     def on_if(self, node, myparents):
-        _test_node = CFGNode(parents=myparents, ast=ast.parse('_if: %s' % astunparse.unparse(node.test).strip()).body[0])
-        ast.copy_location(_test_node.ast_node, node.test)
+        _test_node = self.new_node(parents=myparents, ast=test_ast('_if', node.test))
         test_node = self.walk(node.test, [_test_node])
+        start = self.registry
         g1 = test_node
         for n in node.body:
             g1 = self.walk(n, g1)
+        # see on_while
+        _test_node.body_rids = range(start, self.registry)
         g2 = test_node
         for n in node.orelse:
             g2 = self.walk(n, g2)
@@ -278,7 +418,7 @@ class PyCFG:
         return p
 
     def on_expr(self, node, myparents):
-        p = [CFGNode(parents=myparents, ast=node)]
+        p = [self.new_node(parents=myparents, ast=node)]
         return self.walk(node.value, p)
 
     def on_return(self, node, myparents):
@@ -290,7 +430,7 @@ class PyCFG:
             parent = parent.parents[0]
         assert hasattr(parent, 'return_nodes')
 
-        p = CFGNode(parents=val_node, ast=node)
+        p = self.new_node(parents=val_node, ast=node)
 
         # make the break one of the parents of label node.
         parent.return_nodes.append(p)
@@ -306,10 +446,10 @@ class PyCFG:
         args = node.args
         returns = node.returns
 
-        enter_node = CFGNode(parents=[], ast=ast.parse('enter: %s(%s)' % (node.name, ', '.join([a.arg for a in node.args.args])) ).body[0]) # sentinel
+        enter_node = self.new_node(parents=[], ast=ast.parse('enter: %s(%s)' % (node.name, ', '.join([a.arg for a in node.args.args])) ).body[0]) # sentinel
         enter_node.calleelink = True
         ast.copy_location(enter_node.ast_node, node)
-        exit_node = CFGNode(parents=[], ast=ast.parse('exit: %s(%s)' % (node.name, ', '.join([a.arg for a in node.args.args])) ).body[0]) # sentinel
+        exit_node = self.new_node(parents=[], ast=ast.parse('exit: %s(%s)' % (node.name, ', '.join([a.arg for a in node.args.args])) ).body[0]) # sentinel
         exit_node.fn_exit_node = True
         ast.copy_location(exit_node.ast_node, node)
         enter_node.return_nodes = [] # sentinel
@@ -340,7 +480,7 @@ class PyCFG:
         return val
 
     def link_functions(self):
-        for nid,node in CFGNode.cache.items():
+        for nid,node in self.cache.items():
             if node.calls:
                 for calls in node.calls:
                     if calls in self.functions:
@@ -369,11 +509,11 @@ class PyCFG:
                             # #passn.ast_node = exit.ast_node
 
     def update_functions(self):
-        for nid,node in CFGNode.cache.items():
+        for nid,node in self.cache.items():
             _n = self.get_defining_function(node)
 
     def update_children(self):
-        for nid,node in CFGNode.cache.items():
+        for nid,node in self.cache.items():
             for p in node.parents:
                 p.add_child(node)
 
@@ -385,47 +525,156 @@ class PyCFG:
         """
         node = self.parse(src)
         nodes = self.walk(node, [self.founder])
-        self.last_node = CFGNode(parents=nodes, ast=ast.parse('stop').body[0])
+        self.last_node = self.new_node(parents=nodes, ast=ast.parse('stop').body[0])
+        self.last_node.sentinel = True
         ast.copy_location(self.last_node.ast_node, self.founder.ast_node)
         self.update_children()
         self.update_functions()
         self.link_functions()
 
+def immediate_dominators(start, successors, predecessors):
+    """
+    The immediate dominator of every node reachable from start, using
+    the iterative algorithm of Cooper, Harvey and Kennedy ("A Simple,
+    Fast Dominance Algorithm"): idoms are refined in reverse postorder,
+    and the dominators of two nodes are intersected by walking up the
+    dominator tree using RPO numbers. Returns {node: idom}, with
+    idom[start] = start. Unreachable nodes are left out.
+    """
+    traversal = Traversal(start, None, successors, predecessors)
+    order = traversal.reverse_postorder()
+    number = traversal.rpo_number()
+
+    def intersect(a, b):
+        while a != b:
+            while number[a] > number[b]:
+                a = idom[a]
+            while number[b] > number[a]:
+                b = idom[b]
+        return a
+
+    idom = {start: start}
+    changed = True
+    while changed:
+        changed = False
+        for n in order[1:]:
+            new_idom = None
+            for p in predecessors(n):
+                if idom.get(p) is not None:
+                    new_idom = p if new_idom is None else intersect(p, new_idom)
+            if idom.get(n) != new_idom:
+                idom[n] = new_idom
+                changed = True
+    # nodes whose predecessors are all unreachable (when successors and
+    # predecessors disagree) have no idom
+    return {n: d for n, d in idom.items() if d is not None}
+
+def dominance_frontier(idom, predecessors):
+    """
+    The dominance frontier of every node in idom: the nodes where its
+    dominance ends, i.e. join points with a predecessor it dominates
+    but that it does not strictly dominate.
+    """
+    df = {n: set() for n in idom}
+    for n in idom:
+        preds = [p for p in predecessors(n) if p in idom]
+        # a node with a single predecessor is dominated by it, except
+        # the start node, entered again by a back edge
+        if len(preds) < 2 and idom[n] != n:
+            continue
+        # nothing strictly dominates the start node: the walk goes up
+        # to it, and it is in its own frontier
+        stop = idom[n] if idom[n] != n else None
+        for p in preds:
+            runner = p
+            while runner != stop:
+                df[runner].add(n)
+                if runner == idom[runner]:
+                    break
+                runner = idom[runner]
+    return df
+
+def dominator_tree(idom):
+    """{node: [nodes it immediately dominates]}"""
+    tree = {n: [] for n in idom}
+    for n, d in idom.items():
+        if n != d:
+            tree[d].append(n)
+    return tree
+
+def _cfg_edges(cfg, key):
+    # successors and predecessors of a get_cfg() graph, for dominators
+    # (key='parents') or post-dominators (key='children'). The
+    # successors are derived from the predecessors, because parents and
+    # children can disagree once functions are linked.
+    succ = {n: [] for n in cfg}
+    for n in cfg:
+        for p in cfg[n][key]:
+            succ[p].append(n)
+    return (lambda n: succ[n]), (lambda n: cfg[n][key])
+
+def compute_idom(cfg, start = 0, key='parents'):
+    """
+    Immediate dominators of a get_cfg() graph, or immediate
+    post-dominators with key='children' and start at the last node.
+    """
+    successors, predecessors = _cfg_edges(cfg, key)
+    return immediate_dominators(start, successors, predecessors)
+
+def compute_dominance_frontier(cfg, start = 0, key='parents'):
+    """
+    Dominance frontiers of a get_cfg() graph, or post-dominance
+    frontiers with key='children' and start at the last node.
+    """
+    successors, predecessors = _cfg_edges(cfg, key)
+    return dominance_frontier(immediate_dominators(start, successors, predecessors), predecessors)
+
 def compute_dominator(cfg, start = 0, key='parents'):
-    dominator = {}
-    dominator[start] = {start}
-    all_nodes = set(cfg.keys())
-    rem_nodes = all_nodes - {start}
-    for n in rem_nodes:
-        dominator[n] = all_nodes
-
-    c = True
-    while c:
-        c = False
-        for n in rem_nodes:
-            pred_n = cfg[n][key]
-            doms = [dominator[p] for p in pred_n]
-            i = set.intersection(*doms) if doms else set()
-            v = {n} | i
-            if dominator[n] != v:
-                c = True
-            dominator[n] = v
+    """
+    {node: set of its dominators} of a get_cfg() graph (post-dominators
+    with key='children'), expanded from the dominator tree. Nodes
+    unreachable from start only dominate themselves.
+    """
+    successors, predecessors = _cfg_edges(cfg, key)
+    idom = immediate_dominators(start, successors, predecessors)
+    dominator = {start: {start}}
+    # in reverse postorder, the idom of a node is expanded before it
+    for n in Traversal(start, None, successors, predecessors).reverse_postorder():
+        if n != start and n in idom:
+            dominator[n] = dominator[idom[n]] | {n}
+    for n in cfg:
+        if n not in dominator:
+            dominator[n] = {n}
     return dominator
 
+def compute_postdominator(cfg, last, key='children'):
+    return compute_dominator(cfg, start=last, key=key)
+
 def slurp(f):
     with open(f, 'r') as f: return f.read()
 
 
-def get_cfg(pythonfile):
+def get_cfg(pythonfile, cache_dir=None):
+    """
+    The CFG of a file as a dict keyed by line number. With a cache
+    directory (or CFG_CACHE_DIR set), the result for the same source is
+    loaded from there instead (see cfgcache.py).
+    """
+    src = slurp(pythonfile).strip()
+    return cached('get_cfg', src, lambda: _build_cfg(src), cache_dir)
+
+def _build_cfg(src):
     cfg = PyCFG()
-    cfg.gen_cfg(slurp(pythonfile).strip())
-    cache = CFGNode.cache
+    cfg.gen_cfg(src)
+    cache = cfg.cache
+    # the JSON view of every node is built once for the whole graph
+    js = {k: v.to_json() for k,v in cache.items()}
     g = {}
     for k,v in cache.items():
-        j = v.to_json()
+        j = js[k]
         at = j['at']
-        parents_at = [cache[p].to_json()['at'] for p in j['parents']]
-        children_at = [cache[c].to_json()['at'] for c in j['children']]
+        parents_at = [js[p]['at'] for p in j['parents']]
+        children_at = [js[c]['at'] for c in j['children']]
         if at not in g:
             g[at] = {'parents':set(), 'children':set()}
         # remove dummy nodes
@@ -440,7 +689,7 @@ def get_cfg(pythonfile):
 
 def compute_flow(pythonfile):
     cfg,first,last = get_cfg(pythonfile)
-    return cfg, compute_dominator(cfg, start=first), compute_dominator(cfg, start=last, key='children')
+    return cfg, compute_dominator(cfg, start=first), compute_postdominator(cfg, last)
 
 if __name__ == '__main__':
     import json
@@ -465,7 +714,7 @@ if __name__ == '__main__':
             arcs = []
         cfg = PyCFG()
         cfg.gen_cfg(slurp(args.pythonfile).strip())
-        g = CFGNode.to_graph(arcs)
+        g = cfg.to_graph(arcs)
         g.draw(args.pythonfile + '.png', prog='dot')
         print(g.string(), file=sys.stderr)
     elif args.cfg:
@@ -0,0 +1,77 @@
+"""
+Traversal orders over a CFG, shared by the dataflow passes (liveness,
+dominators, ...).
+
+The graph is given as functions returning the successors and the
+predecessors of a node, so the same code works for PyCFG nodes, the
+get_cfg() dictionaries and pygraphviz graphs.
+"""
+
+def postorder(start, successors):
+    """
+    The nodes reachable from start, in DFS postorder. The DFS is
+    iterative: a node is emitted once all its successors are, so deep
+    CFGs do not hit the recursion limit, and every node is emitted
+    exactly once.
+    """
+    order = []
+    visited = {start}
+    stack = [(start, iter(successors(start)))]
+    while stack:
+        n, children = stack[-1]
+        for m in children:
+            if m not in visited:
+                visited.add(m)
+                stack.append((m, iter(successors(m))))
+                break
+        else:
+            stack.pop()
+            order.append(n)
+    return order
+
+def reverse_postorder(start, successors):
+    """
+    The nodes reachable from start, in reverse postorder: every node
+    comes before its successors, except along back edges.
+    """
+    order = postorder(start, successors)
+    order.reverse()
+    return order
+
+class Traversal:
+    """
+    The traversal orders of one CFG. Each order is computed on first
+    use and cached, so all the passes over the same graph share it.
+
+    entry: the start node (forward orders)
+    exit: the stop node (reverse CFG orders)
+    """
+    def __init__(self, entry, exit, successors, predecessors):
+        self.entry = entry
+        self.exit = exit
+        self.successors = successors
+        self.predecessors = predecessors
+        self.cache = {}
+
+    def _cached(self, key, fn):
+        if key not in self.cache:
+            self.cache[key] = fn()
+        return self.cache[key]
+
+    def postorder(self):
+        return self._cached('po', lambda: postorder(self.entry, self.successors))
+
+    def reverse_postorder(self):
+        """RPO on the CFG: the order for forward problems"""
+        return self._cached('rpo', lambda: self.postorder()[::-1])
+
+    def reverse_cfg_postorder(self):
+        return self._cached('po_rcfg', lambda: postorder(self.exit, self.predecessors))
+
+    def reverse_cfg_reverse_postorder(self):
+        """RPO on the reverse CFG: the order for backward problems"""
+        return self._cached('rpo_rcfg', lambda: self.reverse_cfg_postorder()[::-1])
+
+    def rpo_number(self):
+        """Node -> its position in reverse_postorder()"""
+        return self._cached('rpo_number', lambda: {n: i for i, n in enumerate(self.reverse_postorder())})
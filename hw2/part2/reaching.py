@@ -0,0 +1,125 @@
+# Reaching definitions, and the def-use / use-def chains built from them
+#
+# A definition site is a (node, variable) pair for every variable a node
+# writes. Each site gets a bit in a BitDomain (see dataflow.py), and
+#
+#   ReachIn(n) = U_{m in pred(n)} DefGen(m) | (ReachIn(m) & ~DefKill(m))
+#
+# is solved forward with dataflow.solve, on the same FlowGraph as
+# compute_LiveOut in skeleton.py. DefGen(m) are the sites of m, and
+# DefKill(m) every site of the variables m writes.
+#
+# The start node gets a pseudo-definition of every variable, meaning
+# "not initialized": a use that it reaches may read an uninitialized
+# variable.
+#
+# The chains are computed once from the fixed point and stored as
+# bit-vectors, so passes like dead-store detection or constant
+# propagation query them in O(1):
+#
+#   use_def[(n, v)]  the definition sites of v that reach the use of v in n
+#   def_use[(n, v)]  the use sites of the definition of v in n
+#
+# usage: python3 reaching.py <file.py>
+
+import argparse
+
+from pycfg.pycfg import PyCFG, slurp
+from pycfg.flowgraph import FlowGraph
+from dataflow import BitDomain, UNION, solve
+
+class ReachingDefinitions:
+    def __init__(self, CFG):
+        self.graph = CFG
+        entry = CFG.entry
+
+        variables = set({})
+        for n in CFG.nodes():
+            instr = CFG.instruction(n)
+            variables |= instr.reads | instr.writes
+
+        # definition sites: (node, variable) -> bit
+        self.defs = BitDomain()
+        # variable -> the bit-vector of all its definition sites
+        self.var_defs = dict.fromkeys(variables, 0)
+        gen = {}
+        for n in CFG.nodes():
+            written = variables if n == entry else CFG.instruction(n).writes
+            gen[n] = 0
+            for v in sorted(written):
+                bit = self.defs.add((n, v))
+                gen[n] |= bit
+                self.var_defs[v] |= bit
+        kill = {}
+        for n in CFG.nodes():
+            kill[n] = 0
+            for v in CFG.instruction(n).writes:
+                kill[n] |= self.var_defs[v]
+
+        successors = {n: CFG.successors(n) for n in CFG.nodes()}
+        predecessors = {n: CFG.predecessors(n) for n in CFG.nodes()}
+        self.ReachIn, self.evaluations = solve(successors, predecessors, gen, kill,
+                                               direction="forward", meet=UNION,
+                                               order=CFG.traversal.reverse_postorder())
+
+        # use sites: (node, variable) -> bit
+        self.uses = BitDomain()
+        self.use_def = {}
+        self.def_use = dict.fromkeys(self.defs.elements, 0)
+        for n in CFG.nodes():
+            for v in sorted(CFG.instruction(n).reads):
+                use_bit = self.uses.add((n, v))
+                reaching = self.ReachIn[n] & self.var_defs[v]
+                self.use_def[(n, v)] = reaching
+                while reaching:
+                    low = reaching & -reaching
+                    self.def_use[self.defs.elements[low.bit_length() - 1]] |= use_bit
+                    reaching ^= low
+
+    # the definition sites, as (node, variable) pairs, that reach the
+    # use of v in node n
+    def reaching_definitions(self, n, v):
+        return self.defs.decode(self.use_def[(n, v)])
+
+    # the uses, as (node, variable) pairs, of the definition of v in n
+    def definition_uses(self, n, v):
+        return self.uses.decode(self.def_use[(n, v)])
+
+    # the only definition site reaching the use of v in n, or None if
+    # there are several, or none (unreachable code), or if it may be
+    # uninitialized
+    def unique_definition(self, n, v):
+        bits = self.use_def[(n, v)]
+        if not bits or bits & (bits - 1) or bits & self.defs.bit((self.graph.entry, v)):
+            return None
+        return self.defs.elements[bits.bit_length() - 1]
+
+    # is the definition of v in n never used?
+    def is_dead(self, n, v):
+        return self.def_use[(n, v)] == 0
+
+    # the definitions no use is reached by, as (node, variable) pairs
+    def dead_stores(self):
+        return set(d for d, uses in self.def_use.items() if uses == 0 and d[0] != self.graph.entry)
+
+    # the variables that may be used before they are initialized: the
+    # same set as find_undefined_variables in skeleton.py
+    def uninitialized_variables(self):
+        return set(v for (n, v) in self.def_use
+                   if n == self.graph.entry and self.def_use[(n, v)] != 0)
+
+def get_reaching_definitions(input_file):
+    cfg = PyCFG()
+    cfg.gen_cfg(slurp(input_file).strip())
+    return ReachingDefinitions(FlowGraph.from_pycfg(cfg))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pythonfile', help='The python file to be analyzed')
+    args = parser.parse_args()
+    rd = get_reaching_definitions(args.pythonfile)
+    for n, v in sorted(rd.use_def):
+        defs = sorted(rd.graph.instruction(d).label for d, _ in rd.reaching_definitions(n, v))
+        print("%s: %s <- %s" % (rd.graph.instruction(n).label, v, defs))
+    print("dead stores:", sorted(rd.graph.instruction(n).label + " (" + v + ")" for n, v in rd.dead_stores()))
+    print("uninitialized:", rd.uninitialized_variables())
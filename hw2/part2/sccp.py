@@ -0,0 +1,280 @@
+# Sparse conditional constant propagation (Wegman and Zadeck) on the
+# SSA form of a FlowGraph (see ssa.py)
+#
+# Every SSA value gets a lattice value:
+#
+#   TOP         no definition evaluated yet (optimistically a constant)
+#   Const(c)    always the constant c
+#   BOTTOM      may have several values (e.g. x = input())
+#
+# and every CFG edge is either executable or not. Starting from the
+# start node, a node is only evaluated once an edge into it is
+# executable, and an if or while test whose value is a constant only
+# makes the edges of the branch it takes executable (see
+# FlowGraph.branches). Phi-functions only meet the values flowing along
+# executable edges. When the value of an SSA value changes, only the
+# nodes using it are evaluated again.
+#
+# Version 0 of a variable (its value before any assignment) and the
+# parameters of functions are BOTTOM.
+#
+# The nodes that stay non-executable are on provably dead paths:
+# prune_dead_paths() returns the FlowGraph without them, which
+# find_undefined_variables in skeleton.py uses with prune_dead=True.
+#
+# usage: python3 sccp.py <file.py>
+
+import argparse
+import ast
+import operator
+from collections import namedtuple
+
+from pycfg.pycfg import PyCFG, slurp, Test_Labels
+from pycfg.flowgraph import FlowGraph
+from ssa import SSA, value_name
+
+TOP = 'top'
+BOTTOM = 'bottom'
+Const = namedtuple('Const', ['value'])
+
+# the types of the constants that are folded
+Const_Types = (bool, int, float, complex, str, type(None))
+
+Bin_Ops = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+           ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+           ast.Pow: operator.pow, ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+           ast.BitOr: operator.or_, ast.BitXor: operator.xor, ast.BitAnd: operator.and_}
+Unary_Ops = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos,
+             ast.Invert: operator.invert}
+Cmp_Ops = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+           ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Is: operator.is_, ast.IsNot: operator.is_not,
+           ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b}
+
+# the meet of two lattice values
+def meet(a, b):
+    if a == TOP:
+        return b
+    if b == TOP:
+        return a
+    if a == BOTTOM or b == BOTTOM:
+        return BOTTOM
+    if type(a.value) is type(b.value) and a.value == b.value:
+        return a
+    return BOTTOM
+
+# The lattice value of the operands of an operation: BOTTOM if one of
+# them is, else TOP if one of them is, else None (all constants).
+def operands_lattice(values):
+    if BOTTOM in values:
+        return BOTTOM
+    if TOP in values:
+        return TOP
+    return None
+
+# The largest constant that is folded: bits of an int, or characters of
+# a string
+Max_Const_Size = 4096
+
+# The size of a constant: the bits of an int, the length of a string,
+# and 0 for the others (floats and complexes have a fixed size)
+def const_size(value):
+    if isinstance(value, int):
+        return abs(value).bit_length()
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 0
+
+# An upper bound of the size of fn(a, b), before computing it, or None
+# if it is not bigger than the operands
+def result_size(fn, a, b):
+    if fn is operator.pow and isinstance(a, int) and isinstance(b, int) and b > 0:
+        return const_size(a) * b
+    if fn is operator.lshift and isinstance(a, int) and isinstance(b, int):
+        return const_size(a) + max(b, 0)
+    if fn is operator.mul:
+        if isinstance(a, (str, bytes)) or isinstance(b, (str, bytes)):
+            text, times = (a, b) if isinstance(a, (str, bytes)) else (b, a)
+            return const_size(text) * times if isinstance(times, int) else None
+        return const_size(a) + const_size(b)
+    if fn is operator.add:
+        return max(const_size(a), const_size(b)) + 1 if isinstance(a, int) else const_size(a) + const_size(b)
+    return None
+
+# Apply a folding function to constants, giving BOTTOM if it raises, if
+# an operand or the result would be bigger than Max_Const_Size (e.g.
+# 10 ** 10 ** 10 or 'a' * 10 ** 10), or if the result is not fixed by
+# the language
+def fold(fn, *args):
+    if any(const_size(a) > Max_Const_Size for a in args):
+        return BOTTOM
+    # the identity of equal ints or strings depends on interning and
+    # caching, only None, True and False are singletons
+    if fn in (operator.is_, operator.is_not) and not all(a is None or a is True or a is False for a in args):
+        return BOTTOM
+    # str % args can pad to any width
+    if fn is operator.mod and isinstance(args[0], (str, bytes)):
+        return BOTTOM
+    if len(args) == 2:
+        size = result_size(fn, *args)
+        if size is not None and size > Max_Const_Size:
+            return BOTTOM
+    try:
+        value = fn(*args)
+    except Exception:
+        return BOTTOM
+    return Const(value) if isinstance(value, Const_Types) else BOTTOM
+
+# Evaluate an expression, where lookup(name) is the lattice value of a
+# variable
+def evaluate(node, lookup):
+    if isinstance(node, ast.Constant):
+        return Const(node.value) if isinstance(node.value, Const_Types) else BOTTOM
+    if isinstance(node, ast.Name):
+        return lookup(node.id)
+    if isinstance(node, ast.BinOp) and type(node.op) in Bin_Ops:
+        values = [evaluate(node.left, lookup), evaluate(node.right, lookup)]
+        state = operands_lattice(values)
+        return state if state is not None else fold(Bin_Ops[type(node.op)], *(v.value for v in values))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in Unary_Ops:
+        value = evaluate(node.operand, lookup)
+        return value if value in (TOP, BOTTOM) else fold(Unary_Ops[type(node.op)], value.value)
+    if isinstance(node, ast.Compare):
+        values = [evaluate(node.left, lookup)] + [evaluate(c, lookup) for c in node.comparators]
+        state = operands_lattice(values)
+        if state is not None:
+            return state
+        if any(type(op) not in Cmp_Ops for op in node.ops):
+            return BOTTOM
+        result = Const(True)
+        for op, a, b in zip(node.ops, values, values[1:]):
+            result = fold(Cmp_Ops[type(op)], a.value, b.value)
+            if result == BOTTOM or not result.value:
+                break
+        return result
+    if isinstance(node, ast.BoolOp):
+        # a and b: the first falsy operand, or the last one
+        is_and = isinstance(node.op, ast.And)
+        for i, operand in enumerate(node.values):
+            value = evaluate(operand, lookup)
+            if value in (TOP, BOTTOM):
+                return value
+            if i == len(node.values) - 1 or bool(value.value) != is_and:
+                return value
+    if isinstance(node, ast.IfExp):
+        test = evaluate(node.test, lookup)
+        if test in (TOP, BOTTOM):
+            return test
+        return evaluate(node.body if test.value else node.orelse, lookup)
+    # calls, attributes, subscripts, ...
+    return BOTTOM
+
+class SCCP:
+    def __init__(self, CFG):
+        self.graph = CFG
+        self.ssa = SSA(CFG)
+        # SSA value -> lattice value
+        self.values = {}
+        for value, n in self.ssa.definition.items():
+            self.values[value] = BOTTOM if value[1] == 0 else TOP
+        self.executable = set({})
+        self.executable_edges = set({})
+        self.evaluations = 0
+        self.run()
+
+    def lookup(self, n):
+        # the lattice value of the variables read by node n
+        uses = self.ssa.uses[n]
+        return lambda v: self.values[uses[v]] if v in uses else BOTTOM
+
+    def set_value(self, value, lattice, worklist):
+        lattice = meet(self.values[value], lattice)
+        if lattice != self.values[value]:
+            self.values[value] = lattice
+            worklist.extend(n for n in self.ssa.users[value] if n in self.executable)
+
+    # the lattice value of each variable defined by the statement of n
+    def evaluate_defs(self, n):
+        node = self.graph.asts[n]
+        lookup = self.lookup(n)
+        defs = self.ssa.defs[n]
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            return {v: evaluate(node.value, lookup) for v in defs}
+        if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            load = ast.Name(id=node.target.id, ctx=ast.Load())
+            return {v: evaluate(ast.BinOp(left=load, op=node.op, right=node.value), lookup) for v in defs}
+        return {v: BOTTOM for v in defs}
+
+    # the successors of n that are executable once n is
+    def feasible_successors(self, n):
+        successors = self.graph.successors(n)
+        if n not in self.graph.branches:
+            return successors
+        node = self.graph.asts[n]
+        if not (isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name)
+                and node.target.id in Test_Labels):
+            return successors
+        test = evaluate(node.annotation, self.lookup(n))
+        if test == TOP:
+            return []
+        if test == BOTTOM:
+            return successors
+        true, false = self.graph.branches[n]
+        return true if test.value else false
+
+    def run(self):
+        entry = self.graph.entry
+        self.executable.add(entry)
+        worklist = [entry]
+        while worklist:
+            n = worklist.pop()
+            self.evaluations += 1
+
+            for v, phi in self.ssa.phis[n].items():
+                lattice = TOP
+                for p, value in phi.args.items():
+                    if (p, n) in self.executable_edges:
+                        lattice = meet(lattice, self.values[value])
+                self.set_value(phi.dest, lattice, worklist)
+
+            for v, lattice in self.evaluate_defs(n).items():
+                self.set_value(self.ssa.defs[n][v], lattice, worklist)
+
+            for s in self.feasible_successors(n):
+                if (n, s) in self.executable_edges:
+                    continue
+                self.executable_edges.add((n, s))
+                self.executable.add(s)
+                worklist.append(s)
+
+    # the nodes reachable in the CFG that are on provably dead paths
+    def dead_nodes(self):
+        return set(self.ssa.idom) - self.executable
+
+    # the SSA values known to be constants: value -> constant
+    def constants(self):
+        return {value: lattice.value for value, lattice in self.values.items()
+                if isinstance(lattice, Const)}
+
+    # The FlowGraph with only the executable edges. The nodes keep their
+    # ids and instructions, but dead nodes have no edges.
+    def prune_dead_paths(self):
+        g = self.graph
+        edges = [(p, c) for p in g.nodes() for c in g.successors(p) if (p, c) in self.executable_edges]
+        branches = {n: ([s for s in t if (n, s) in self.executable_edges],
+                        [s for s in f if (n, s) in self.executable_edges])
+                    for n, (t, f) in g.branches.items()}
+        return FlowGraph(g.instrs, edges, g.entry, g.exit, g.asts, branches)
+
+def get_sccp(input_file):
+    cfg = PyCFG()
+    cfg.gen_cfg(slurp(input_file).strip())
+    return SCCP(FlowGraph.from_pycfg(cfg))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pythonfile', help='The python file to be analyzed')
+    args = parser.parse_args()
+    sccp = get_sccp(args.pythonfile)
+    for value, c in sorted(sccp.constants().items()):
+        print("%s = %r" % (value_name(value), c))
+    print("dead:", [sccp.graph.instruction(n).label for n in sorted(sccp.dead_nodes())])
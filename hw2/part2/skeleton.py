@@ -1,84 +1,65 @@
 # skeleton file for UCSC CSE211 Homework 2: part 1
 
-from pycfg.pycfg import PyCFG, CFGNode, slurp 
+from pycfg.pycfg import PyCFG, slurp 
+from pycfg.flowgraph import FlowGraph
+from pycfg.cfgcache import cached, get_cache_dir
+from dataflow import BitDomain, UNION, solve
+from sccp import SCCP
+from interproc import find_undefined_variables_interprocedural
 import argparse 
-import re
+import multiprocessing
 
 # Acks: I used
 # https://www.geeksforgeeks.org/draw-control-flow-graph-using-pycfg-python/
 # to get started with PyCFG. 
 
-# Given a node, returns the instruction as a string
-# instructions are of the form:
-def get_node_instruction(n):
-    return n.attr["label"]
+# Given a CFG and a node, returns the instruction of the node: its
+# label (e.g. "3: x = y") and the sets of variables it writes and
+# reads. The variables are decoded once from the AST of the node when
+# the CFG is built (see CFGNode.defs_uses in pycfg/pycfg.py).
+def get_node_instruction(CFG, n):
+    return CFG.instruction(n)
 
 # Given a CFG and a node, return a list of successor nodes
 def get_node_successors(CFG, n):
     return CFG.successors(n)
 
-# given a node instruction string (e.g. from get_node_instruction),
-# returns the name of the variable that is read (if any)
+# given a node instruction (e.g. from get_node_instruction), returns
+# the set of variables that are read: the condition of "if" and
+# "while" instructions, and the rhs of assignments. inputs and the
+# special nodes (start and stop) don't read any variable.
 def reads_var(i):
+    return i.reads
 
-    # matches "if" instructions of the form: <label>: if: <var>
-    # returns <var> because it is a read variable
-    if "if" in i:
-        return re.match("\d+:\s*if:\s*(\S+)",i)[1]
-
-    # matches "while" instructions of the form: <label>: while: <var>
-    # returns <var> because it is a read variable
-    if "while" in i:
-        return re.match("\d+:\s*while:\s*(\S+)",i)[1]
-
-    # inputs don't read any variable
-    if "input" in i:
-        return None
-
-    # special nodes (start and stop) do not read anything
-    if "start" in i or "stop" in i:
-        return None
-
-    # otherwise the instruction is an assignment of the form:
-    # <label>: <var> = <var>
-    # Returns the rhs variable
-    assert("=" in i)
-    return re.match("\d+:\s*(\S+)\s*=\s*(\S+)",i)[2]
-
-# given a node instruction string (e.g. from get_node_instruction),
-# returns the name of the variable that is written (if any)
+# given a node instruction (e.g. from get_node_instruction), returns
+# the set of variables that are written: the lhs of inputs and
+# assignments. "if" and "while" instructions and the special nodes
+# (start and stop) don't write to any variable.
 def writes_var(i):
-
-    # if statements in this subset don't write to any variables
-    if "if" in i:
-        return None
-
-    # while loops in this subset don't write to any variables
-    if "while" in i:
-        return None
-
-    # inputs write to the lhs variable
-    if "input" in i:
-        return re.match("\d+:\s*(\S+)\s*=\s*input\(\)",i)[1]
-
-    # special nodes (start and stop) do not write to a variable
-    if "start" in i or "stop" in i:
-        return None
-
-    # otherwise the instruction is an assignment of the form:
-    # <label>: <var> = <var>
-    # Returns the lhs variable
-    assert("=" in i)
-    return re.match("\d+:\s*(\S+)\s*=\s*(\S+)",i)[1]
-
-# use PyCFG to get a CFG of the python input file.  Graph is returned
-# as a PyGraphviz graph.  Don't worry too much about this function. It
-# just uses the PyCFG API
-def get_graph(input_file):
+    return i.writes
+
+# use PyCFG to get a CFG of the python input file. The graph is
+# returned as a FlowGraph (see pycfg/flowgraph.py): nodes are integer
+# ids, with the start node first and the stop node last. Don't worry
+# too much about this function. It just uses the PyCFG API.
+# With a cache directory (or CFG_CACHE_DIR set), graphs are stored
+# there and loaded again for unchanged files (see pycfg/cfgcache.py).
+def get_graph(input_file, cache_dir=None):
+    src = slurp(input_file).strip()
+    if get_cache_dir(cache_dir) is None:
+        return build_graph(src)
+    return FlowGraph.from_data(cached('flowgraph', src, lambda: build_graph(src).to_data(), cache_dir))
+
+# build the FlowGraph of a source with PyCFG
+def build_graph(src):
     cfg = PyCFG()
-    cfg.gen_cfg(slurp(input_file).strip())
-    arcs = []
-    return CFGNode.to_graph(arcs)
+    cfg.gen_cfg(src)
+    return FlowGraph.from_pycfg(cfg)
+
+# get the traversal orders of a CFG (see pycfg/traversal.py). They are
+# computed once per CFG and shared by all the passes.
+def get_traversal(CFG):
+    return CFG.traversal
 
 # get the domain of all the variables. This is needed for the set
 # compliment of VarKill in the iterative algorithm to compute LiveOut
@@ -90,17 +71,11 @@ def compute_VarDomain(CFG):
     # for each node in the CFG
     for n in CFG.nodes():
 
-        # get the variables that are read from
-        var1 = reads_var(get_node_instruction(n))
-
-        # get the variables that are written to
-        var2 = writes_var(get_node_instruction(n))
+        # add the variables that are read from
+        VarDomain |= reads_var(get_node_instruction(CFG, n))
 
-        # only add the variables if they are not None
-        if var1 is not None:
-            VarDomain = VarDomain.union(set([var1]))
-        if var2 is not None:
-            VarDomain = VarDomain.union(set([var2]))
+        # add the variables that are written to
+        VarDomain |= writes_var(get_node_instruction(CFG, n))
 
     # return the final set
     return VarDomain
@@ -112,8 +87,10 @@ def compute_UEVar(CFG):
     UEVar = {}
 
     # Homework: implement this function.
+    # Each node is a single statement, which reads its variables before
+    # writing any, so every variable read is upward exposed.
     for n in CFG.nodes():
-        UEVar[n] = reads_var(get_node_instruction(n))
+        UEVar[n] = reads_var(get_node_instruction(CFG, n))
         
     return UEVar
 
@@ -125,7 +102,7 @@ def compute_VarKill(CFG):
 
     # Homework: implement this function.
     for n in CFG.nodes():
-        VarKill[n] = writes_var(get_node_instruction(n))
+        VarKill[n] = writes_var(get_node_instruction(CFG, n))
 
     return VarKill
 
@@ -136,63 +113,38 @@ def compute_VarKill(CFG):
 
 # You can use get_node_successors(CFG, n) to get a list of n's
 # successor nodes.
-def compute_LiveOut(CFG, UEVar, VarKill, VarDomain):
+def compute_LiveOut(CFG, UEVar, VarKill, VarDomain, verbose=True):
 
     LiveOut = {}
 
     # Homework: implement this function.
 
-    # Types of order:
-    #   "default"  : node number 0,1,2,3,...
-    #   "rpo"      : reverse post-order on CFG (essentially BFS on CFG)
-    #   "rpo_rcfg" : reverse post-order on reverse CFG (essentially BFS on reverse CFG)
-
-    order = 'rpo_rcfg'
-
-    if order == 'default':
-        nodes = CFG.nodes()
-    elif order == 'rpo':
-        nodes = []
-        visited = set({})
-        queue = [CFG.get_node(0)]
-        while len(queue):
-            n = queue.pop()
-            nodes.append(n)
-            visited.add(n)
-            for m in get_node_successors(CFG, n):
-                if m not in visited:
-                    queue.append(m)
-    elif order == 'rpo_rcfg':
-        nodes = []
-        visited = set({})
-        queue = [CFG.get_node(len(CFG.nodes())-1)]
-        while len(queue):
-            n = queue.pop()
-            nodes.append(n)
-            visited.add(n)
-            for m in CFG.predecessors(n):
-                if m not in visited:
-                    queue.append(m)
-
-    for n in nodes:
-        LiveOut[n] = set({})
-
-    changed = True
-    num_iter = 0
-    while changed:
-        num_iter += 1
-        changed = False
-        for n in nodes:
-            new_LiveOut = set({})
-            for m in get_node_successors(CFG, n):
-                if UEVar[m]:
-                    new_LiveOut.add(UEVar[m])
-                VarKillBar = VarDomain - set({VarKill[m]})
-                new_LiveOut = new_LiveOut.union(LiveOut[m].intersection(VarKillBar))
-            if new_LiveOut != LiveOut[n]:
-                LiveOut[n] = new_LiveOut
-                changed = True
-    print("#Iter = {}".format(num_iter))
+    # LiveOut, UEVar and VarKill are computed as bit-vectors over
+    # VarDomain (see dataflow.py):
+    #   LiveOut(n) = U_{m in succ(n)} UEVar(m) | (LiveOut(m) & ~VarKill(m))
+    domain = BitDomain(VarDomain)
+    UEVarBits = {}
+    VarKillBits = {}
+    successors = {}
+    predecessors = {}
+    for n in CFG.nodes():
+        UEVarBits[n] = domain.encode(UEVar[n])
+        VarKillBits[n] = domain.encode(VarKill[n])
+        successors[n] = get_node_successors(CFG, n)
+        predecessors[n] = CFG.predecessors(n)
+
+    # LiveOut flows from the successors to the predecessors, so the
+    # worklist is seeded in reverse post-order on the reverse CFG,
+    # starting from the stop node.
+    order = get_traversal(CFG).reverse_cfg_reverse_postorder()
+
+    LiveOutBits, num_eval = solve(successors, predecessors, UEVarBits, VarKillBits,
+                                  direction="backward", meet=UNION, order=order)
+    if verbose:
+        print("#Eval = {}".format(num_eval))
+
+    for n in CFG.nodes():
+        LiveOut[n] = domain.decode(LiveOutBits[n])
 
     return LiveOut
 
@@ -222,22 +174,44 @@ def compute_LiveOut(CFG, UEVar, VarKill, VarDomain):
 #    4. The "rpo_rcfg" is the best order because LiveOut flows from the last node to the first.
 #    5. Ideally on a DAG the optimal #iter should be 2, but there are cases where 3 iterations are necessary.
 #       I think the extra iterations are due to loops, where LiveOut needs to be passed at least twice to reach stable states.
+#    6. The iterations above re-evaluate every node each time. compute_LiveOut now uses a worklist (see dataflow.solve)
+#       that only re-evaluates the predecessors of nodes whose LiveOut changed. Tests 0-7 (8, 7, 8, 10, 12, 14, 14, 14 nodes)
+#       take 8, 7, 8, 15, 16, 18, 21, 22 node evaluations, seeded in reverse post-order on the reverse CFG.
+#    7. The "rpo" and "rpo_rcfg" orders in the table were built by marking nodes visited when popped from a stack,
+#       which gives a DFS preorder with duplicated nodes rather than a reverse post-order, one source of the extra
+#       iterations in 5. The orders now come from pycfg/traversal.py (iterative DFS postorder).
+#    8. The table above only covers the 8 small test cases. benchmark.py measures the same orders with both solvers
+#       of dataflow.py (round-robin and worklist) on programs from generator.py, up to 10000 statements and 1000
+#       variables; benchmark_baseline.json has the results (wall time, evaluations, iterations, peak memory).
+#       At 10000 statements, round-robin takes 1404 iterations in the default and rpo orders and 7 in rpo_rcfg,
+#       and the worklist solver in rpo_rcfg takes 14338 evaluations, about 1.4 per node.
 
 # The uninitialized variables are the LiveOut variables from the start
 # node. It is fine if your implementation needs to change this
 # function. It simply needs to return a set of uninitialized variables
 def get_uninitialized_variables_from_LiveOut(CFG, LiveOut):
-    return LiveOut[CFG.get_node(0)]
+    return LiveOut[CFG.entry]
 
 # The testing function. Keep the signature of this function the
 # same as it will be used for grading. I highly recommend you keep the
 # function exactly the same and simply implement the constituent
 # functions.
-def find_undefined_variables(input_python_file):
+def find_undefined_variables(input_python_file, verbose=True, prune_dead=False, interprocedural=False):
+
+    # Optionally analyse each function once and apply its summary at
+    # the calls instead of following the linked CFG (see interproc.py).
+    # prune_dead does not apply in this mode.
+    if interprocedural:
+        return find_undefined_variables_interprocedural(input_python_file)
 
     # Convert the python file into a CFG
     CFG = get_graph(input_python_file)
 
+    # Optionally drop the paths that constant propagation proves are
+    # never taken (see sccp.py), so uses on them are not reported
+    if prune_dead:
+        CFG = SCCP(CFG).prune_dead_paths()
+
     # Get the variable domain (used to compute the VarKill set
     # compliment in the iterative algorithm)
     VarDomain = compute_VarDomain(CFG)
@@ -249,11 +223,32 @@ def find_undefined_variables(input_python_file):
     VarKill  = compute_VarKill(CFG)
 
     # Get LiveOut
-    LiveOut = compute_LiveOut(CFG, UEVar, VarKill, VarDomain)
+    LiveOut = compute_LiveOut(CFG, UEVar, VarKill, VarDomain, verbose)
 
     # Return a set of unintialized variables
     return get_uninitialized_variables_from_LiveOut(CFG, LiveOut)
 
+# Analyse one file for find_undefined_variables_many. Errors (e.g. a
+# syntax error or a construct PyCFG does not support) are reported for
+# that file instead of stopping the whole batch.
+def analyze_file(input_python_file):
+    try:
+        undefs = find_undefined_variables(input_python_file, verbose=False)
+        return input_python_file, {"undefined": sorted(undefs)}
+    except Exception as e:
+        return input_python_file, {"error": "%s: %s" % (type(e).__name__, e)}
+
+# Run find_undefined_variables on many files in one process, or in a
+# pool of 'jobs' processes, so the interpreter and imports are paid
+# once per worker instead of once per file. Returns a dict from each
+# path to {"undefined": [<sorted variable names>]} or {"error": <msg>},
+# in the order of paths, ready to be dumped as JSON.
+def find_undefined_variables_many(paths, jobs=1):
+    if jobs > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            return dict(pool.imap(analyze_file, paths, chunksize=16))
+    return dict(map(analyze_file, paths))
+
 # if you run this file, you can give it one of the python test cases
 # in the test_cases/ directory.
 # see solutions.py for what to expect for each test case.
@@ -0,0 +1,205 @@
+# Static single assignment form of a FlowGraph (see pycfg/flowgraph.py)
+#
+# Every definition of a variable gets a new version, written "x_3". The
+# value of a variable before any assignment is its version 0, defined by
+# the start node. Where several versions of a variable meet, a
+# phi-function picks the one of the predecessor control came from.
+#
+# The construction is the one of Cytron et al.:
+#
+#   1. the immediate dominators and dominance frontiers of the CFG are
+#      computed with the Cooper-Harvey-Kennedy algorithm
+#      (immediate_dominators and dominance_frontier in pycfg/pycfg.py).
+#   2. phi-functions for a variable are placed on the iterated dominance
+#      frontier of its definitions, but only at nodes where the variable
+#      is live (pruned SSA): LiveIn comes from the same liveness problem
+#      as compute_LiveOut in skeleton.py.
+#   3. variables are renamed in a preorder walk of the dominator tree,
+#      with a stack of versions per variable.
+#
+# Nodes are single statements (reads happen before writes), and a node
+# has its phi-functions at its start. Nodes not reachable from the start
+# node are left out.
+#
+# Once in SSA form, analyses that would iterate over every node (e.g.
+# liveness for uninitialized variables) only follow the def-use edges of
+# the values they track. uninitialized_variables() is such a sparse
+# version of find_undefined_variables.
+#
+# usage: python3 ssa.py <file.py>
+
+import argparse
+from collections import namedtuple
+
+from pycfg.pycfg import PyCFG, slurp, immediate_dominators, dominance_frontier, dominator_tree
+from pycfg.flowgraph import FlowGraph
+from dataflow import BitDomain, UNION, solve
+
+# dest: the value defined by the phi-function
+# args: predecessor node -> the value flowing from it
+Phi = namedtuple('Phi', ['dest', 'args'])
+
+# the name of a value, e.g. ("x", 3) -> "x_3"
+def value_name(value):
+    return "%s_%d" % value
+
+# LiveIn of every node, as a bit-vector over domain:
+#   LiveIn(n) = UEVar(n) | (LiveOut(n) & ~VarKill(n))
+def compute_LiveIn(CFG, domain):
+    gen = {}
+    kill = {}
+    for n in CFG.nodes():
+        gen[n] = domain.encode(CFG.instruction(n).reads)
+        kill[n] = domain.encode(CFG.instruction(n).writes)
+    successors = {n: CFG.successors(n) for n in CFG.nodes()}
+    predecessors = {n: CFG.predecessors(n) for n in CFG.nodes()}
+    LiveOut, _ = solve(successors, predecessors, gen, kill, direction="backward", meet=UNION,
+                       order=CFG.traversal.reverse_cfg_reverse_postorder())
+    return {n: gen[n] | (LiveOut[n] & ~kill[n]) for n in CFG.nodes()}
+
+class SSA:
+    def __init__(self, CFG):
+        self.graph = CFG
+        entry = CFG.entry
+
+        self.idom = immediate_dominators(entry, CFG.successors, CFG.predecessors)
+        self.df = dominance_frontier(self.idom, CFG.predecessors)
+
+        variables = set({})
+        for n in CFG.nodes():
+            instr = CFG.instruction(n)
+            variables |= instr.reads | instr.writes
+        self.domain = BitDomain(variables)
+        LiveIn = compute_LiveIn(CFG, self.domain)
+
+        # node -> {variable: Phi}
+        self.phis = {n: {} for n in self.idom}
+        self.place_phis(entry, LiveIn)
+
+        # node -> {variable: the value it reads}
+        self.uses = {n: {} for n in self.idom}
+        # node -> {variable: the value it defines}
+        self.defs = {n: {} for n in self.idom}
+        # value -> the node defining it (by a phi-function or a write)
+        self.definition = {}
+        # value -> the nodes reading it (in a phi-function or a statement)
+        self.users = {}
+        self.rename(entry, variables)
+
+    # Place the phi-functions of every variable on the iterated
+    # dominance frontier of its definitions, where it is live
+    def place_phis(self, entry, LiveIn):
+        def_nodes = {v: [entry] for v in self.domain.elements}
+        for n in self.idom:
+            for v in self.graph.instruction(n).writes:
+                def_nodes[v].append(n)
+
+        for v, nodes in def_nodes.items():
+            bit = self.domain.bit(v)
+            worklist = list(nodes)
+            queued = set(nodes)
+            while worklist:
+                n = worklist.pop()
+                for d in self.df[n]:
+                    if v in self.phis[d] or not LiveIn[d] & bit:
+                        continue
+                    self.phis[d][v] = Phi(None, {})
+                    if d not in queued:
+                        queued.add(d)
+                        worklist.append(d)
+
+    # Rename the variables in a preorder walk of the dominator tree.
+    # The walk is iterative, so deep CFGs do not hit the recursion limit.
+    def rename(self, entry, variables):
+        tree = dominator_tree(self.idom)
+        counter = {v: 0 for v in variables}
+        stacks = {v: [(v, 0)] for v in variables}
+        for v in variables:
+            self.definition[(v, 0)] = entry
+            self.users[(v, 0)] = set()
+
+        def new_value(n, v):
+            counter[v] += 1
+            value = (v, counter[v])
+            stacks[v].append(value)
+            self.definition[value] = n
+            self.users[value] = set()
+            pushed.append(v)
+            return value
+
+        # (node, the variables whose stacks to pop when leaving it)
+        walk = [(entry, None)]
+        while walk:
+            n, pushed = walk.pop()
+            if pushed is not None:
+                for v in pushed:
+                    stacks[v].pop()
+                continue
+            pushed = []
+            walk.append((n, pushed))
+
+            for v in sorted(self.phis[n]):
+                self.phis[n][v] = Phi(new_value(n, v), self.phis[n][v].args)
+            instr = self.graph.instruction(n)
+            for v in sorted(instr.reads):
+                value = stacks[v][-1]
+                self.uses[n][v] = value
+                self.users[value].add(n)
+            for v in sorted(instr.writes):
+                self.defs[n][v] = new_value(n, v)
+
+            for s in self.graph.successors(n):
+                for v, phi in self.phis.get(s, {}).items():
+                    value = stacks[v][-1]
+                    phi.args[n] = value
+                    self.users[value].add(s)
+
+            for c in reversed(tree[n]):
+                walk.append((c, None))
+
+    # Sparse uninitialized variable detection: the version 0 values, and
+    # the phi-functions with a possibly uninitialized argument, are
+    # followed along their uses only. Returns the variables with a
+    # statement reading a possibly uninitialized value.
+    def uninitialized_variables(self):
+        maybe_uninit = set((v, 0) for v in self.domain.elements)
+        worklist = list(maybe_uninit)
+        undefined = set({})
+        while worklist:
+            value = worklist.pop()
+            for n in self.users[value]:
+                if self.uses[n].get(value[0]) == value:
+                    undefined.add(value[0])
+                phi = self.phis[n].get(value[0])
+                if phi is not None and value in phi.args.values() and phi.dest not in maybe_uninit:
+                    maybe_uninit.add(phi.dest)
+                    worklist.append(phi.dest)
+        return undefined
+
+    # The SSA form of node n as text, e.g.
+    #   "x_2 = phi(x_0, x_1); 3: y = x | defs: y_1 | uses: x_2"
+    def text(self, n):
+        parts = []
+        for v, phi in sorted(self.phis[n].items()):
+            args = ", ".join(value_name(phi.args[p]) for p in sorted(phi.args))
+            parts.append("%s = phi(%s)" % (value_name(phi.dest), args))
+        instr = self.graph.instruction(n)
+        uses = ", ".join(value_name(self.uses[n][v]) for v in sorted(self.uses[n]))
+        defs = ", ".join(value_name(self.defs[n][v]) for v in sorted(self.defs[n]))
+        parts.append("%s%s%s" % (instr.label, " | defs: " + defs if defs else "",
+                                 " | uses: " + uses if uses else ""))
+        return "; ".join(parts)
+
+def get_ssa(input_file):
+    cfg = PyCFG()
+    cfg.gen_cfg(slurp(input_file).strip())
+    return SSA(FlowGraph.from_pycfg(cfg))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pythonfile', help='The python file to be analyzed')
+    args = parser.parse_args()
+    ssa = get_ssa(args.pythonfile)
+    for n in ssa.graph.traversal.reverse_postorder():
+        print(ssa.text(n))
+    print("uninitialized:", ssa.uninitialized_variables())
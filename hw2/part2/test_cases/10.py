@@ -0,0 +1,74 @@
+v0 = input()
+v1 = v0
+v2 = v1
+v3 = v2
+v4 = v3
+v5 = v4
+v6 = v5
+v7 = v6
+v8 = v7
+v9 = v8
+v10 = v9
+v11 = v10
+v12 = v11
+v13 = v12
+v14 = v13
+v15 = v14
+v16 = v15
+v17 = v16
+v18 = v17
+v19 = v18
+v20 = v19
+v21 = v20
+v22 = v21
+v23 = v22
+v24 = v23
+v25 = v24
+v26 = v25
+v27 = v26
+v28 = v27
+v29 = v28
+v30 = v29
+v31 = v30
+v32 = v31
+v33 = v32
+v34 = v33
+v35 = v34
+v36 = v35
+v37 = v36
+v38 = v37
+v39 = v38
+v40 = v39
+v41 = v40
+v42 = v41
+v43 = v42
+v44 = v43
+v45 = v44
+v46 = v45
+v47 = v46
+v48 = v47
+v49 = v48
+v50 = v49
+v51 = v50
+v52 = v51
+v53 = v52
+v54 = v53
+v55 = v54
+v56 = v55
+v57 = v56
+v58 = v57
+v59 = v58
+v60 = v59
+v61 = v60
+v62 = v61
+v63 = v62
+v64 = v63
+v65 = v64
+v66 = v65
+v67 = v66
+v68 = v67
+
+if v68:
+    v69 = v70
+
+w = v69
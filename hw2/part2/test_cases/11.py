@@ -0,0 +1,8 @@
+a = 10 ** 64
+b = a ** 64
+c = b ** 64
+d = c ** 64
+e = d ** 64
+
+if e:
+    y = z
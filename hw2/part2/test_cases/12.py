@@ -0,0 +1,26 @@
+s = 'a' * 4000
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+s = s + s
+
+if s:
+    y = z
@@ -0,0 +1,9 @@
+a = 1000
+b = 1000
+
+if a is b:
+    w = y
+
+c = None
+if c is not None:
+    w = z
@@ -0,0 +1,15 @@
+x = input()
+debug = 0
+n = 3
+
+if debug:
+    x = y
+
+while n > 5:
+    w = z
+    n = n - 1
+
+if n == 3:
+    v = x
+else:
+    v = u
@@ -0,0 +1,20 @@
+def init():
+    global a
+    a = input()
+
+def scale(n):
+    m = n
+    return m
+
+def pick(n):
+    if n:
+        total = n
+    return total
+
+def report():
+    print(a, b)
+
+init()
+x = scale(a)
+y = pick(x)
+report()
@@ -7,5 +7,111 @@ solutions = {
     5: set({}),
     6: set({'y'}),
     7: set({}),
+    8: set({'y', 'z', 'u'}),
+    9: set({'a', 'b', 'total'}),
+    10: set({'v69', 'v70'}),
+    11: set({'z'}),
+    12: set({'z'}),
+    13: set({'y', 'z'}),
              }
 
+# the solutions of tester.py --check pruned (find_undefined_variables
+# with prune_dead=True), where they differ from the ones above
+pruned_solutions = {
+    8: set({}),
+    13: set({'y'}),
+             }
+
+# the solutions of tester.py --check interprocedural
+# (find_undefined_variables with interprocedural=True), where they
+# differ from the ones above
+interprocedural_solutions = {
+    9: set({'b', 'total'}),
+             }
+
+# the solutions of tester.py --check dot: the coverage arcs the graph
+# is colored with, and the DOT text of PyCFG.to_dot
+dot_solutions = {
+    1: ([(1, 3), (3, 6), (6, 8)], """strict digraph {
+	0 [label="0: start"];
+	1 [label="1: x = input()"];
+	2 [label="3: if: x"];
+	3 [label="4: y = x"];
+	4 [label="6: z = x"];
+	5 [label="8: w = y"];
+	6 [label="0: stop"];
+	0 -> 1 [color="red"];
+	1 -> 2 [color="blue"];
+	2 -> 3 [color="red"];
+	2 -> 4 [color="blue"];
+	3 -> 5 [color="red"];
+	4 -> 5 [color="blue"];
+	5 -> 6 [color="red"];
+}
+"""),
+    9: ([], """strict digraph {
+	0 [label="0: start"];
+	1 [label="1: enter: init()"];
+	2 [label="1: exit: init()"];
+	3 [label="3: a = input()"];
+	4 [label="5: enter: scale(n)"];
+	5 [label="5: exit: scale(n)"];
+	6 [label="6: m = n"];
+	7 [label="7: return m"];
+	8 [label="9: enter: pick(n)"];
+	9 [label="9: exit: pick(n)"];
+	10 [label="10: if: n"];
+	11 [label="11: total = n"];
+	12 [label="12: return total"];
+	13 [label="14: enter: report()"];
+	14 [label="14: exit: report()"];
+	15 [label="15: print(a, b)"];
+	16 [label="17: init()"];
+	17 [label="18: x = scale(a)"];
+	18 [label="19: y = pick(x)"];
+	19 [label="20: report()"];
+	20 [label="0: stop"];
+	16 -> 1;
+	3 -> 2;
+	1 -> 3;
+	17 -> 4;
+	7 -> 5;
+	4 -> 6;
+	6 -> 7;
+	18 -> 8;
+	12 -> 9;
+	8 -> 10;
+	10 -> 11;
+	11 -> 12;
+	10 -> 12;
+	19 -> 13;
+	15 -> 14;
+	13 -> 15;
+	0 -> 16;
+	16 -> 17 [style="dotted", weight="100"];
+	2 -> 17;
+	17 -> 18 [style="dotted", weight="100"];
+	5 -> 18;
+	18 -> 19 [style="dotted", weight="100"];
+	9 -> 19;
+	19 -> 20 [style="dotted", weight="100"];
+	14 -> 20;
+}
+"""),
+             }
+
+# the solutions of tester.py --check dominators for a diamond (1) and a
+# loop (3): the immediate dominators, the dominance frontiers and the
+# post-dominators of the nodes of get_cfg, by line number. Line 0 is both
+# the start and the stop node, so the last node has an edge back to it.
+dominator_solutions = {
+    1: ({0: 0, 1: 0, 3: 1, 4: 3, 6: 3, 8: 3},
+        {0: set({0}), 1: set({0}), 3: set({0}), 4: set({8}), 6: set({8}), 8: set({0})},
+        {0: set({0}), 1: set({0, 1, 3, 8}), 3: set({0, 3, 8}), 4: set({0, 4, 8}), 6: set({0, 6, 8}),
+         8: set({0, 8})}),
+    3: ({0: 0, 1: 0, 2: 1, 4: 2, 5: 4, 6: 5, 7: 6, 8: 5, 9: 8},
+        {0: set({0}), 1: set({0}), 2: set({0}), 4: set({0, 4}), 5: set({4}), 6: set({8}), 7: set({8}),
+         8: set({4}), 9: set({4})},
+        {0: set({0}), 1: set({0, 1, 2, 4}), 2: set({0, 2, 4}), 4: set({0, 4}), 5: set({0, 4, 5, 8}),
+         6: set({0, 4, 6, 7, 8}), 7: set({0, 4, 7, 8}), 8: set({0, 4, 8}), 9: set({0, 4, 9})}),
+             }
@@ -1,18 +1,418 @@
 import test_cases.solutions
-import sys
+import argparse
+import ast
+import glob
 import os
+import sys
+import tempfile
 
 import skeleton as candidate
+from reaching import get_reaching_definitions
+from ssa import get_ssa, value_name
+from incremental import IncrementalLiveness, flatten
+from pycfg.pycfg import PyCFG, get_cfg, slurp
+from pycfg.pycfg import compute_idom, compute_dominance_frontier, compute_dominator, compute_postdominator
+from pycfg import cfgcache
+from pycfg.branchcov import capture_coverage, capture_coverage_fast
+
+solutions = test_cases.solutions
+
+# Each check analyses one test case and returns whether it passed, the
+# variables found and the expected ones
+
+# find_undefined_variables against the solution
+def check_liveness(test_num, test_file):
+    undefs = candidate.find_undefined_variables(test_file)
+    sol = solutions.solutions[test_num]
+    return undefs == sol, undefs, sol
+
+# LiveOut of every node of the graph of a test case, from the
+# functions of skeleton.py
+def live_out(CFG):
+    return candidate.compute_LiveOut(CFG, candidate.compute_UEVar(CFG), candidate.compute_VarKill(CFG),
+                                     candidate.compute_VarDomain(CFG), verbose=False)
+
+# The uninitialized variables and dead stores of reaching.py. A
+# definition is dead (reaches no use) exactly when its variable is not
+# in LiveOut of its node.
+def check_reaching(test_num, test_file):
+    rd = get_reaching_definitions(test_file)
+    LiveOut = live_out(rd.graph)
+    dead = set((n, v) for n in rd.graph.nodes() if n != rd.graph.entry
+               for v in rd.graph.instruction(n).writes if v not in LiveOut[n])
+    undefs = rd.uninitialized_variables()
+    sol = solutions.solutions[test_num]
+    return undefs == sol and rd.dead_stores() == dead, (undefs, rd.dead_stores()), (sol, dead)
+
+# The statements, as (node, variable) definition sites of reaching.py,
+# an SSA value may come from: its phi-functions are followed back to
+# the values flowing into them.
+def definition_sites(form, value):
+    sites = set({})
+    seen = {value}
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        n = form.definition[value]
+        phi = form.phis[n].get(value[0])
+        if phi is None or phi.dest != value:
+            sites.add((n, value[0]))
+            continue
+        for arg in phi.args.values():
+            if arg not in seen:
+                seen.add(arg)
+                stack.append(arg)
+    return sites
+
+# The uninitialized variables of ssa.py, and the SSA form itself: the
+# value each statement reads must come from the same definitions as
+# the ones reaching it in reaching.py, and phi-functions are only
+# placed where their variable is live.
+def check_ssa(test_num, test_file):
+    form = get_ssa(test_file)
+    rd = get_reaching_definitions(test_file)
+    LiveOut = live_out(form.graph)
+    instr = form.graph.instruction
+    errors = []
+    for n in form.idom:
+        for v, value in form.uses[n].items():
+            if definition_sites(form, value) != rd.reaching_definitions(n, v):
+                errors.append("%s read in node %d" % (value_name(value), n))
+        for v in form.phis[n]:
+            if v not in instr(n).reads | (LiveOut[n] - instr(n).writes):
+                errors.append("phi of dead %s in node %d" % (v, n))
+    undefs = form.uninitialized_variables()
+    sol = solutions.solutions[test_num]
+    return undefs == sol and not errors, (undefs, errors), (sol, [])
+
+# find_undefined_variables with the paths constant propagation proves
+# dead pruned (see sccp.py). Pruning only removes uses, so the result
+# must also be a subset of the one without pruning.
+def check_pruned(test_num, test_file):
+    flat = candidate.find_undefined_variables(test_file, verbose=False)
+    undefs = candidate.find_undefined_variables(test_file, verbose=False, prune_dead=True)
+    sol = solutions.pruned_solutions.get(test_num, solutions.solutions[test_num])
+    return undefs == sol and undefs <= flat, undefs, sol
+
+# find_undefined_variables with interprocedural=True (see
+# interproc.py). Where it differs from the flat analysis on the linked
+# CFG (e.g. a global written by a called function), the solution is in
+# interprocedural_solutions.
+def check_interprocedural(test_num, test_file):
+    undefs = candidate.find_undefined_variables(test_file, verbose=False, interprocedural=True)
+    sol = solutions.interprocedural_solutions.get(test_num, solutions.solutions[test_num])
+    return undefs == sol, undefs, sol
+
+# the results of vectorized.py for every test case, solved as a single
+# batch, so the graphs share the rows of the bit-matrices
+vectorized_results = {}
+
+# The results of vectorized.py (batch.py --vectorized) against the ones
+# of find_undefined_variables_many for each file, and the solution
+def check_vectorized(test_num, test_file):
+    if not vectorized_results:
+        # numpy is only needed for this check
+        from vectorized import find_undefined_variables_vectorized
+        paths = glob.glob(os.path.join("test_cases", "[0-9]*.py"))
+        vectorized_results.update(find_undefined_variables_vectorized(paths))
+    undefs = vectorized_results[test_file]
+    scalar = candidate.find_undefined_variables_many([test_file])[test_file]
+    sol = {"undefined": sorted(solutions.solutions[test_num])}
+    return undefs == scalar == sol, undefs, sol
+
+# The successive edits check_incremental makes to the source of a test
+# case, as (source, whether the CFG keeps its shape). The first ones
+# replace a line, keeping the shape: nothing, the last assignment reads
+# input() instead, the first one reads a new variable, the first if or
+# while tests a new variable. The last one appends a statement.
+def incremental_edits(src):
+    lines = src.split("\n")
+    stmts = [st for st in ast.walk(ast.parse(src)) if isinstance(st, ast.stmt)]
+    assigns = [st for st in stmts if isinstance(st, ast.Assign) and st.lineno == st.end_lineno]
+    tests = [st for st in stmts if isinstance(st, (ast.If, ast.While))]
+
+    def replace(lineno, line):
+        lines[lineno - 1] = line
+        return "\n".join(lines)
+
+    def indent(lineno):
+        line = lines[lineno - 1]
+        return line[:len(line) - len(line.lstrip())]
+
+    edits = [(src, True)]
+    if assigns:
+        last = max(assigns, key=lambda st: st.lineno)
+        edits.append((replace(last.lineno, indent(last.lineno) + lines[last.lineno - 1].strip().split("=")[0]
+                              + "= input()"), True))
+        first = min(assigns, key=lambda st: st.lineno)
+        edits.append((replace(first.lineno, indent(first.lineno) + lines[first.lineno - 1].strip().split("=")[0]
+                              + "= edited_a"), True))
+    if tests:
+        first = min(tests, key=lambda st: st.lineno)
+        keyword = "if" if isinstance(first, ast.If) else "while"
+        edits.append((replace(first.lineno, indent(first.lineno) + keyword + " edited_b:"), True))
+    edits.append(("\n".join(lines).rstrip() + "\nedited_c = edited_d\n", False))
+    return edits
+
+# IncrementalLiveness.update (see incremental.py) on successive edits of
+# a test case against a full find_undefined_variables of each version.
+# Edits that keep the shape of a supported program must be analysed
+# incrementally, the others from scratch.
+def check_incremental(test_num, test_file):
+    src = slurp(test_file)
+    analysis = IncrementalLiveness(src)
+    supported = flatten(ast.parse(src.strip()))[1] is not None
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp:
+        edited_file = os.path.join(tmp, "edited.py")
+        for i, (edited, same_shape) in enumerate(incremental_edits(src)):
+            undefs = analysis.update(edited)
+            with open(edited_file, "w") as f:
+                f.write(edited)
+            expected = candidate.find_undefined_variables(edited_file, verbose=False)
+            if undefs != expected:
+                errors.append("edit %d: %s instead of %s" % (i, undefs, expected))
+            modes = ("incremental", "unchanged") if supported and same_shape else ("full",)
+            if analysis.mode not in modes:
+                errors.append("edit %d: %s analysis" % (i, analysis.mode))
+    return not errors, errors, []
+
+# The on-disk CFG cache (see pycfg/cfgcache.py) on a test case: a
+# cached graph is the one built from the source and is not built
+# again, a changed source or ANALYZER_VERSION misses the cache, a
+# corrupt cache file is rebuilt, and an unwritable cache directory
+# falls back to building the graph.
+def check_cache(test_num, test_file):
+    src = slurp(test_file).strip()
+    expected = candidate.build_graph(src).to_data()
+    builds = []
+    errors = []
+
+    def build():
+        builds.append(1)
+        return expected
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if candidate.get_graph(test_file, cache_dir=tmp).to_data() != expected:
+            errors.append("graph stored in the cache")
+        if cfgcache.cached("flowgraph", src, build, tmp) != expected or builds:
+            errors.append("cache hit")
+        cfgcache.cached("flowgraph", src + "\n# edited", build, tmp)
+        if len(builds) != 1:
+            errors.append("changed source")
+        cfgcache.ANALYZER_VERSION += 1
+        try:
+            cfgcache.cached("flowgraph", src, build, tmp)
+        finally:
+            cfgcache.ANALYZER_VERSION -= 1
+        if len(builds) != 2:
+            errors.append("changed version")
+
+        with open(os.path.join(tmp, cfgcache.cache_key("flowgraph", src) + ".bin"), "wb") as f:
+            f.write(b"corrupt")
+        if candidate.get_graph(test_file, cache_dir=tmp).to_data() != expected:
+            errors.append("corrupt cache file")
+        if cfgcache.cached("flowgraph", src, build, tmp) != expected or len(builds) != 2:
+            errors.append("corrupt cache file not replaced")
+
+        # a cache directory under a file cannot be created
+        with open(os.path.join(tmp, "file"), "w") as f:
+            f.write("")
+        if candidate.get_graph(test_file, cache_dir=os.path.join(tmp, "file", "cache")).to_data() != expected:
+            errors.append("unwritable cache directory")
+    return not errors, errors, []
+
+# A function running a test case, with input() returning "" (so that
+# the loops end). The test cases reading undefined variables stop with a
+# NameError, which is caught unless raise_errors is set.
+def test_case_runner(test_file, raise_errors=False):
+    code = compile(slurp(test_file), test_file, "exec")
+
+    def run():
+        try:
+            exec(code, {"__name__": "__main__", "input": lambda: ""})
+        except NameError:
+            if raise_errors:
+                raise
+    return run
+
+# branch_cov as branchcov.py computed it before arcs were counted: every
+# traced event of every file is kept, and the arcs of the file asked for
+# are only picked afterwards
+def reference_branch_cov(fn, fsrc):
+    events = []
+    prev = [None, 0]
+
+    def trace(frame, event, arg):
+        if event in ["call", "return", "line"]:
+            fname, line = frame.f_code.co_filename, frame.f_lineno
+            events.append((prev[0], fname, prev[1], line))
+            prev[:] = [fname, line]
+        return trace
+
+    oldtrace = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        fn()
+    finally:
+        sys.settrace(oldtrace)
+    branch_cov = {}
+    for pf, f, i, j in events:
+        if fsrc not in f: continue
+        if pf is None or fsrc not in pf: i = 0
+        if i != 0:
+            branch_cov.setdefault(i, set()).add(j)
+    return branch_cov
+
+# capture_coverage_fast with every free sys.monitoring tool id taken by
+# another tool, so that it falls back to settrace
+def capture_coverage_settrace(fn, fsrc):
+    if not hasattr(sys, "monitoring"):
+        return capture_coverage_fast(fn, fsrc)
+    mon = sys.monitoring
+    taken = [tool for tool in range(6) if mon.get_tool(tool) is None]
+    for tool in taken:
+        mon.use_tool_id(tool, "tester")
+    try:
+        return capture_coverage_fast(fn, fsrc)
+    finally:
+        for tool in taken:
+            mon.free_tool_id(tool)
+
+# The branch coverage of pycfg/branchcov.py on a run of a test case
+# against reference_branch_cov: capture_coverage, and
+# capture_coverage_fast on sys.monitoring (python 3.12+) and on
+# settrace. A run stopped by an exception must leave no sys.monitoring
+# tool id claimed. The test cases 11 and 12 build huge numbers and
+# strings and are not run.
+def check_coverage(test_num, test_file):
+    run = test_case_runner(test_file)
+    expected = reference_branch_cov(run, test_file)
+    cov_arcs, source_code, branch_cov = capture_coverage(run, test_file)
+    errors = []
+    if branch_cov != expected:
+        errors.append("capture_coverage: %s" % branch_cov)
+    if len(cov_arcs) != len(set((i, j) for f, i, j, c, l in cov_arcs)):
+        errors.append("an arc listed twice in cov_arcs")
+    captures = {"fast": capture_coverage_fast, "fast, settrace": capture_coverage_settrace}
+    for name, capture in captures.items():
+        branch_cov = capture(run, test_file)[2]
+        if branch_cov != expected:
+            errors.append("capture_coverage_fast (%s): %s" % (name, branch_cov))
+
+    if hasattr(sys, "monitoring"):
+        free = [tool for tool in range(6) if sys.monitoring.get_tool(tool) is None]
+        try:
+            capture_coverage_fast(test_case_runner(test_file, raise_errors=True), test_file)
+        except NameError:
+            pass
+        if [tool for tool in range(6) if sys.monitoring.get_tool(tool) is None] != free:
+            errors.append("tool id not released")
+    return not errors, errors, expected
+
+# PyCFG.edges and to_dot (see print_dot.py) on the graph of a test
+# case: without coverage arcs the edges are the parent links of the
+# graph, and to_dot writes every node and edge once. Where the test case
+# has a solution, the DOT text with its arcs must be that one.
+def check_dot(test_num, test_file):
+    cfg = PyCFG()
+    cfg.gen_cfg(slurp(test_file).strip())
+    links = set((p.rid, cnode.rid) for cnode in cfg.cache.values() for p in cnode.parents)
+    edges = set((p, c) for p, c, attrs in cfg.edges())
+    dot = cfg.to_dot().split("\n")
+    nodes = [line for line in dot if line.endswith("];") and "->" not in line]
+    dot_edges = [tuple(int(rid) for rid in line.split(" [")[0].rstrip(";").split(" -> "))
+                 for line in dot if "->" in line]
+    errors = []
+    if edges != links:
+        errors.append("edges: %s" % sorted(edges ^ links))
+    if len(dot_edges) != len(set(dot_edges)) or set(dot_edges) != links or len(nodes) != len(cfg.cache):
+        errors.append("to_dot: %s" % dot_edges)
+    if test_num in solutions.dot_solutions:
+        arcs, sol = solutions.dot_solutions[test_num]
+        if cfg.to_dot(arcs) != sol:
+            errors.append(cfg.to_dot(arcs))
+    return not errors, errors, []
+
+# The dominators of a get_cfg() graph by their definition (or its
+# post-dominators with key='children' and start at the last node): d
+# dominates n when n cannot be reached from start without going through
+# d. Unreachable nodes only dominate themselves.
+def dominators_by_definition(cfg, start, key):
+    succ = {n: set() for n in cfg}
+    for n in cfg:
+        for p in cfg[n][key]:
+            succ[p].add(n)
+
+    def reachable(removed):
+        seen = set() if start == removed else {start}
+        stack = list(seen)
+        while stack:
+            for m in succ[stack.pop()]:
+                if m not in seen and m != removed:
+                    seen.add(m)
+                    stack.append(m)
+        return seen
+
+    everything = reachable(None)
+    dominators = {n: {n} for n in cfg}
+    for d in everything:
+        for n in everything - reachable(d):
+            dominators[n].add(d)
+    return dominators
+
+# compute_dominator, compute_postdominator and
+# compute_dominance_frontier (see pycfg/pycfg.py) on the graph of a test
+# case against dominators_by_definition; the dominance frontier of d
+# holds the nodes with a predecessor dominated by d that d does not
+# strictly dominate. Where the test case has a solution, the immediate
+# dominators, dominance frontiers and post-dominators must be those.
+def check_dominators(test_num, test_file):
+    cfg, first, last = get_cfg(test_file)
+    dominators = dominators_by_definition(cfg, first, "parents")
+    df = {n: set(m for m in cfg if any(n in dominators[p] for p in cfg[m]["parents"])
+                 and (m == n or n not in dominators[m]))
+          for n in compute_idom(cfg, first)}
+    errors = []
+    if compute_dominator(cfg, first) != dominators:
+        errors.append("dominators: %s" % compute_dominator(cfg, first))
+    if compute_dominance_frontier(cfg, first) != df:
+        errors.append("dominance frontiers: %s" % compute_dominance_frontier(cfg, first))
+    if compute_postdominator(cfg, last) != dominators_by_definition(cfg, last, "children"):
+        errors.append("post-dominators: %s" % compute_postdominator(cfg, last))
+    if test_num in solutions.dominator_solutions:
+        idom, frontiers, postdominators = solutions.dominator_solutions[test_num]
+        got = (compute_idom(cfg, first), compute_dominance_frontier(cfg, first), compute_postdominator(cfg, last))
+        if got != (idom, frontiers, postdominators):
+            errors.append(got)
+    return not errors, errors, []
+
+CHECKS = {"liveness": check_liveness,
+          "reaching": check_reaching,
+          "ssa": check_ssa,
+          "pruned": check_pruned,
+          "interprocedural": check_interprocedural,
+          "vectorized": check_vectorized,
+          "incremental": check_incremental,
+          "cache": check_cache,
+          "coverage": check_coverage,
+          "dot": check_dot,
+          "dominators": check_dominators}
+
+# usage: python3 tester.py [--check <name>] <test number> [<test number> ...]
+parser = argparse.ArgumentParser()
+parser.add_argument('tests', nargs='+', type=int, help='the test case numbers')
+parser.add_argument('--check', choices=sorted(CHECKS), default='liveness', help='the analysis to test')
+args = parser.parse_args()
+
+for test_num in args.tests:
+    test_file = os.path.join("test_cases", str(test_num) + ".py")
+    ok, undefs, sol = CHECKS[args.check](test_num, test_file)
 
-test_num = int(sys.argv[1])
-test_file = os.path.join("test_cases", str(test_num) + ".py")
-undefs = candidate.find_undefined_variables(test_file)
-sol = test_cases.solutions.solutions[test_num]
-
-if undefs != sol:
-    print("failed on test case number: " + str(test_num))
-    print("expected: " + str(sol))
-    print("got: " + str(undefs))
-else:
-    print("passed test: " + str(test_num))
-    print("---")
+    if not ok:
+        print("failed on test case number: " + str(test_num))
+        print("expected: " + str(sol))
+        print("got: " + str(undefs))
+    else:
+        print("passed test: " + str(test_num))
+        print("---")
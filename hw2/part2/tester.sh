@@ -1,6 +1,12 @@
-
-for i in {0..7}
-	 do
-	 python3 tester.py $i
-done
-	 
+# each check runs all the test cases in a single python process
+python3 tester.py {0..13}
+python3 tester.py --check reaching {0..13}
+python3 tester.py --check ssa {0..13}
+python3 tester.py --check pruned {0..13}
+python3 tester.py --check interprocedural {0..13}
+python3 tester.py --check vectorized {0..13}
+python3 tester.py --check incremental {0..13}
+python3 tester.py --check cache {0..13}
+python3 tester.py --check coverage {0..10} 13
+python3 tester.py --check dot {0..13}
+python3 tester.py --check dominators {0..13}
@@ -0,0 +1,153 @@
+# Vectorised liveness over many CFGs at once, with NumPy
+#
+# find_undefined_variables_many runs one python-level fixed point per
+# file, paying the interpreter overhead once per node evaluation. Here
+# the FlowGraphs of a whole batch of files are packed into one graph:
+#
+#   - the nodes of every graph get consecutive global row numbers, so
+#     the successors form one block-diagonal adjacency matrix, stored
+#     in CSR form (indptr, indices), as are the predecessors.
+#   - UEVar, VarKill and LiveOut are bit-matrices with one row per node
+#     and the variables of each graph packed into uint64 words. Each
+#     graph numbers its own variables, so the rows of different graphs
+#     share the same columns.
+#
+# The transfer function
+#
+#   LiveOut(n) = OR_{m in succ(n)} UEVar(m) | (LiveOut(m) & ~VarKill(m))
+#
+# is then applied to all the rows whose successors changed at once: the
+# successor rows are gathered with the CSR arrays and OR-ed per node
+# with np.bitwise_or.reduceat. The number of rounds is the longest
+# propagation chain in the batch, so this suits corpora of many small
+# files better than a few very large ones, where dataflow.solve in
+# reverse postorder needs far fewer evaluations (see benchmark.py).
+#
+# numpy is only needed by this module (see batch.py --vectorized).
+
+from itertools import chain
+
+import numpy as np
+
+from dataflow import BitDomain
+from skeleton import get_graph
+
+class Batch:
+    """
+    The FlowGraphs of many files packed into one graph.
+    """
+    def __init__(self, graphs):
+        self.graphs = graphs
+        # the first row of each graph
+        self.offsets = []
+        self.domains = []
+        gen = []
+        kill = []
+        # number of successors / predecessors of each row, and the rows
+        # of the successors / predecessors of each graph
+        succ_counts = []
+        pred_counts = []
+        succ_rows = []
+        pred_rows = []
+        offset = 0
+        for CFG in graphs:
+            self.offsets.append(offset)
+            instrs = CFG.instrs
+            domain = BitDomain(set().union(*[i.reads for i in instrs], *[i.writes for i in instrs]))
+            self.domains.append(domain)
+            gen += [domain.encode(i.reads) for i in instrs]
+            kill += [domain.encode(i.writes) for i in instrs]
+            succ_counts += map(len, CFG.succ)
+            pred_counts += map(len, CFG.pred)
+            succ_rows.append(np.fromiter(chain.from_iterable(CFG.succ), dtype=np.int64) + offset)
+            pred_rows.append(np.fromiter(chain.from_iterable(CFG.pred), dtype=np.int64) + offset)
+            offset += len(CFG)
+
+        self.num_nodes = offset
+        # uint64 words per row
+        self.words = max([(len(d) + 63) // 64 for d in self.domains] + [1])
+        self.UEVar = self.pack(gen)
+        self.VarKill = self.pack(kill)
+        self.succ_indptr, self.succ_indices = csr(succ_counts, succ_rows)
+        self.pred_indptr, self.pred_indices = csr(pred_counts, pred_rows)
+
+    # python int bit-vectors -> a (rows, words) uint64 bit-matrix
+    def pack(self, rows):
+        size = self.words * 8
+        data = b''.join(bits.to_bytes(size, 'little') for bits in rows)
+        return np.frombuffer(data, dtype='<u8').reshape(len(rows), self.words).astype(np.uint64)
+
+    # a row of a bit-matrix -> a python int bit-vector
+    def unpack(self, row):
+        return int.from_bytes(row.astype('<u8').tobytes(), 'little')
+
+# CSR arrays (indptr, indices) from the number of neighbours of each
+# row and the arrays of neighbours
+def csr(counts, neighbours):
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(counts)
+    indices = np.concatenate(neighbours) if neighbours else np.zeros(0, dtype=np.int64)
+    return indptr, indices
+
+# The positions in 'indices' of the neighbours of each row in rows,
+# grouped by row, and the number of neighbours of each row
+def gather(indptr, rows):
+    counts = indptr[rows + 1] - indptr[rows]
+    starts = np.repeat(indptr[rows] - (np.cumsum(counts) - counts), counts)
+    return starts + np.arange(int(counts.sum())), counts
+
+# Solve LiveOut for every node of a batch. Returns the LiveOut
+# bit-matrix and the number of rounds.
+def solve_liveout(batch):
+    LiveOut = np.zeros_like(batch.UEVar)
+    # UEVar(m) | (LiveOut(m) & ~VarKill(m)): what m passes to its predecessors
+    LiveIn = batch.UEVar.copy()
+    not_kill = ~batch.VarKill
+
+    rows = np.arange(batch.num_nodes)
+    rounds = 0
+    while rows.size:
+        rounds += 1
+        positions, counts = gather(batch.succ_indptr, rows)
+        values = LiveIn[batch.succ_indices[positions]]
+        new = np.zeros((rows.size, batch.words), dtype=np.uint64)
+        has_succ = counts > 0
+        if values.size:
+            segments = (np.cumsum(counts) - counts)[has_succ]
+            new[has_succ] = np.bitwise_or.reduceat(values, segments, axis=0)
+
+        changed = rows[(new != LiveOut[rows]).any(axis=1)]
+        LiveOut[rows] = new
+        if not changed.size:
+            break
+        LiveIn[changed] = batch.UEVar[changed] | (LiveOut[changed] & not_kill[changed])
+        # only the predecessors of the changed nodes can change next
+        positions, _ = gather(batch.pred_indptr, changed)
+        rows = np.unique(batch.pred_indices[positions])
+    return LiveOut, rounds
+
+# The uninitialized variables of each graph: LiveOut of its start node
+def undefined_variables(batch, LiveOut):
+    return [domain.decode(batch.unpack(LiveOut[offset + CFG.entry]))
+            for CFG, domain, offset in zip(batch.graphs, batch.domains, batch.offsets)]
+
+# Same as find_undefined_variables_many in skeleton.py (same results,
+# same format), with one vectorised fixed point per batch of
+# batch_size files
+def find_undefined_variables_vectorized(paths, batch_size=1024):
+    results = {}
+    for i in range(0, len(paths), batch_size):
+        graphs = []
+        names = []
+        for path in paths[i:i + batch_size]:
+            try:
+                graphs.append(get_graph(path))
+                names.append(path)
+            except Exception as e:
+                results[path] = {"error": "%s: %s" % (type(e).__name__, e)}
+        if graphs:
+            batch = Batch(graphs)
+            LiveOut, _ = solve_liveout(batch)
+            for path, undefs in zip(names, undefined_variables(batch, LiveOut)):
+                results[path] = {"undefined": sorted(undefs)}
+    return {path: results[path] for path in paths}